@@ -1,10 +1,19 @@
 import base64
 import binascii
+import json
+import os
+import re
 
 from Crypto.Cipher import AES
 
 __key = b"#I88--_NrPAqCm9N"
 
+# {"content":"...", <plain number/string fields>}, the shape TimableOutput writes; anything else goes to json.loads
+_CONTENT_PATTERN = re.compile(
+    r'\{"content":"([^"\\\x00-\x1f]*)"'
+    r'(?:,"(?!content")[^"\\\x00-\x1f]*":'
+    r'(?:-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|"[^"\\\x00-\x1f]*"|true|false|null))*\}')
+
 
 def __base64_decode(s):
     try:
@@ -20,10 +29,31 @@ def __base64_decode(s):
         return base64.urlsafe_b64decode(s)
 
 
+def __base64_decode_padded(s):
+    # same padding rule as __base64_decode, without raising and catching on every unpadded line
+    padding = len(s) % 4
+    if padding == 1:
+        raise ValueError('Invalid base64 string')
+    elif padding:
+        s += '=' * (4 - padding)
+    return base64.urlsafe_b64decode(s)
+
+
 def __unpad(s):
     return s[:-ord(s[len(s) - 1:])]
 
 
+def __pad(s):
+    padding = 16 - len(s) % 16
+    return s + bytes([padding]) * padding
+
+
+def encrypt(plain):
+    iv = os.urandom(16)
+    encrypt_helper = AES.new(__key, AES.MODE_CFB, iv, segment_size=128)
+    return bytes.decode(base64.urlsafe_b64encode(iv + encrypt_helper.encrypt(__pad(str.encode(plain)))))
+
+
 def decrypt(encrypted_with_iv):
     encrypted_with_iv = __base64_decode(encrypted_with_iv)
     iv = encrypted_with_iv[:16]
@@ -31,3 +61,40 @@ def decrypt(encrypted_with_iv):
     decrypt_helper = AES.new(__key, AES.MODE_CFB, iv, segment_size=128)
     decrypted = __unpad(decrypt_helper.decrypt(encrypted))
     return bytes.decode(decrypted).strip()
+
+
+def __content(plain):
+    matcher = _CONTENT_PATTERN.fullmatch(plain)
+    if matcher:
+        return matcher.group(1)
+    return json.loads(plain)['content']
+
+
+def decrypt_content(encrypted_with_iv):
+    encrypted_with_iv = __base64_decode_padded(encrypted_with_iv)
+    decrypt_helper = AES.new(__key, AES.MODE_CFB, encrypted_with_iv[:16], segment_size=128)
+    return __content(bytes.decode(__unpad(decrypt_helper.decrypt(encrypted_with_iv[16:]))).strip())
+
+
+def decrypt_contents(encrypted_list):
+    # CFB-128 decrypts block i as C[i] xor E(C[i - 1]) with C[0] = iv, so the keystream of every line
+    # comes out of one ECB pass over all their shifted ciphertexts instead of one cipher object per line
+    decoded_list = list(map(__base64_decode_padded, encrypted_list))
+    keystream_input = []
+    for encrypted_with_iv in decoded_list:
+        if len(encrypted_with_iv) < 16:
+            raise ValueError('Incorrect IV length')
+        blocks = -(-(len(encrypted_with_iv) - 16) // 16)
+        keystream_input.append(encrypted_with_iv[:16 * blocks])
+    keystream = AES.new(__key, AES.MODE_ECB).encrypt(b''.join(keystream_input))
+
+    contents = []
+    position = 0
+    for encrypted_with_iv, block in zip(decoded_list, keystream_input):
+        encrypted = encrypted_with_iv[16:]
+        mask = keystream[position:position + len(encrypted)]
+        decrypted = (int.from_bytes(encrypted, 'big') ^ int.from_bytes(mask, 'big')).to_bytes(len(encrypted), 'big')
+        position += len(block)
+        contents.append(__content(bytes.decode(__unpad(decrypted)).strip()))
+    return contents
+
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import sys
+from multiprocessing import Pool
+from time import perf_counter
+
+import yaml
+
+from check import get_base_and_max_time
+from judge import judge, judge_stream
+from metrics import collect
+from metrics import enabled as metrics_enabled
+from spj import _iter_tail_strip, _remove_pretime, _tail_strip, _time_options, _to_bool
+
+CASE_FILE = 'data.yml'
+OUTPUT_FILE = 'stdout.txt'
+
+
+def find_cases(data_dir):
+    cases = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        if CASE_FILE in files:
+            cases.append(os.path.relpath(root, data_dir).replace(os.sep, '/'))
+    return cases
+
+
+def load_case(case_dir):
+    with open(os.path.join(case_dir, CASE_FILE)) as case_file:
+        case = yaml.safe_load(case_file) or {}
+    options = dict((case.get('test') or {}).get('data') or {})
+    input_file = (case.get('run') or {}).get('input_file') or 'stdin.txt'
+    with open(os.path.join(case_dir, input_file)) as _input_file:
+        input_list = _tail_strip(list(map(str.strip, _input_file)))
+    return input_list, options
+
+
+def _split_options(options):
+    options = dict(options)
+    check_max_time = _to_bool(options.pop('check_max_time', None))
+    need_decrypt = _to_bool(options.pop('need_decrypt', None))
+    stream = _to_bool(options.pop('stream', None))
+    options.pop('metrics', None)
+    options.pop('metrics_file', None)
+    options.pop('report_window', None)
+    options.pop('event_cache', None)
+    options.pop('verdict_memo', None)
+    options.pop('multi_elevator', None)
+    return check_max_time, need_decrypt, stream, _time_options(**options)
+
+
+def _judge_output(input_list, output_path, options, max_time):
+    check_max_time, need_decrypt, stream, time_options = _split_options(options)
+    with open(output_path) as output_file:
+        if stream:
+            output_iter = map(_remove_pretime, _iter_tail_strip(map(str.strip, output_file)))
+            return judge_stream(input_list, output_iter, check_max_time, need_decrypt, time_options, max_time,
+                                multi_elevator=_to_bool(options.get('multi_elevator')))
+        output_list = list(map(_remove_pretime, _tail_strip(list(map(str.strip, output_file)))))
+    return judge(input_list, output_list, check_max_time, need_decrypt, time_options, max_time,
+                 event_cache=_to_bool(options.get('event_cache')), verdict_memo=_to_bool(options.get('verdict_memo')),
+                 multi_elevator=_to_bool(options.get('multi_elevator')))
+
+
+def _judge_task_output(input_list, output_path, options, max_time):
+    try:
+        correct, message, output_list, score = _judge_output(input_list, output_path, options, max_time)
+    except Exception as err:
+        # reported the same way pyspj reports a crashed special judge
+        correct, message, score = False, 'Exception occurred while special judge - {cls}.'.format(cls=repr(err)), 0
+    return correct, message, score
+
+
+def _judge_task(task):
+    submission, case, input_list, output_path, options, max_time = task
+    begin_time = perf_counter()
+    result = {'submission': submission, 'case': case}
+    if metrics_enabled(options.get('metrics')):
+        with collect() as record:
+            result['correct'], result['message'], result['score'] = \
+                _judge_task_output(input_list, output_path, options, max_time)
+        result['metrics'] = record
+    else:
+        result['correct'], result['message'], result['score'] = \
+            _judge_task_output(input_list, output_path, options, max_time)
+    result['elapsed'] = perf_counter() - begin_time
+    return result
+
+
+def _tasks(data_dir, submissions_dir):
+    submissions = sorted(name for name in os.listdir(submissions_dir)
+                         if os.path.isdir(os.path.join(submissions_dir, name)))
+    for case in find_cases(data_dir):
+        input_list, options = load_case(os.path.join(data_dir, case))
+        output_paths = [(submission, os.path.join(submissions_dir, submission, case, OUTPUT_FILE))
+                        for submission in submissions]
+        output_paths = [(submission, path) for submission, path in output_paths if os.path.isfile(path)]
+        if not output_paths:
+            continue
+        # the time limit only depends on the test case, so it is estimated once for all submissions
+        check_max_time, need_decrypt, stream, time_options = _split_options(options)
+        max_time = get_base_and_max_time(input_list, **time_options)[1] if check_max_time else None
+        for submission, output_path in output_paths:
+            yield submission, case, input_list, output_path, options, max_time
+
+
+def batch_judge(data_dir, submissions_dir, workers=None):
+    tasks = _tasks(data_dir, submissions_dir)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for task in tasks:
+            yield _judge_task(task)
+    else:
+        with Pool(workers) as pool:
+            yield from pool.imap(_judge_task, tasks, chunksize=4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Judge every submission against every test case in one process.')
+    parser.add_argument('data_dir', help='test case tree, every directory with a data.yml is a test case')
+    parser.add_argument('submissions_dir',
+                        help='one directory per submission, mirroring the test case tree with stdout.txt files')
+    parser.add_argument('-o', '--output', help='JSON Lines result file, default is stdout')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, default is all cores')
+    args = parser.parse_args(argv)
+
+    result_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in batch_judge(args.data_dir, args.submissions_dir, args.workers):
+            result_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+            result_file.flush()
+    finally:
+        if result_file is not sys.stdout:
+            result_file.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+import argparse
+import glob
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tracemalloc
+from time import perf_counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_REPORT = os.path.join(BENCH_DIR, 'benchmarks', 'importtime.txt')
+MODEL_REPORT = os.path.join(BENCH_DIR, 'benchmarks', 'model.txt')
+EVENTS_REPORT = os.path.join(BENCH_DIR, 'benchmarks', 'events.txt')
+SUITE_BASELINE = os.path.join(BENCH_DIR, 'benchmarks', 'suite.json')
+
+SUITE_PHASES = ['time_limit', 'decrypt', 'parse', 'simulate', 'report', 'end_to_end']
+SCALING_LINES = [1000, 10000, 100000, 1000000]
+SCALING_REQUESTS = [30, 100, 1000, 10000]
+
+# modules the plain-text judgement without time check must never load
+LAZY_MODULES = ['aes', 'Crypto', 'check', 'cache', 'sqlite3', 'numpy', 'pyspj', 'concurrent.futures']
+
+IMPORTTIME_SCENARIOS = [
+    ('plain judge', 'import judge\n'
+                    'judge.judge(["[0.0]1-FROM-1-TO-2"], ["[0.0000]OPEN-1"], need_decrypt=False)\n'),
+    ('plain spj_func', 'import io, spj\n'
+                       'spj.spj_func(io.StringIO("[0.0]1-FROM-1-TO-2"), io.StringIO("[0.0][0.0000]OPEN-1"))\n'),
+    ('time-checked judge', 'import judge\n'
+                           'judge.judge(["[0.0]1-FROM-1-TO-2"], ["[0.0000]OPEN-1"], True, False)\n'),
+    ('spj cli', 'import runpy, sys\n'
+                'sys.argv = ["spj.py", "-v"]\n'
+                'try:\n'
+                '    runpy.run_path("spj.py", run_name="__main__")\n'
+                'except SystemExit:\n'
+                '    pass\n'),
+]
+
+_IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$')
+
+
+def _importtime(code, repeat):
+    # best of `repeat` cold interpreters, -X importtime reports microseconds per module
+    best = None
+    for i in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BENCH_DIR,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+                                 env=dict(os.environ, ELEVATOR_SPJ_CACHE_DIR=''))
+        modules = {}
+        for line in process.stderr.splitlines():
+            matcher = _IMPORTTIME_PATTERN.match(line)
+            if matcher:
+                modules[matcher.group(4)] = (int(matcher.group(1)), int(matcher.group(2)), len(matcher.group(3)))
+        total = sum(cumulative for own, cumulative, depth in modules.values() if depth == 1)
+        if best is None or total < best[0]:
+            best = total, modules
+    return best
+
+
+def importtime_report(repeat=5):
+    lines = []
+    for name, code in IMPORTTIME_SCENARIOS:
+        total, modules = _importtime(code, repeat)
+        loaded = [module for module in LAZY_MODULES if module in modules]
+        lines.append('{name}: {total:.1f} ms, {count} modules, lazy modules loaded: {loaded}'.format(
+            name=name, total=total / 1000, count=len(modules), loaded=', '.join(loaded) or 'none'))
+        top = sorted(((cumulative, module) for module, (own, cumulative, depth) in modules.items() if depth == 1),
+                     reverse=True)[:8]
+        for cumulative, module in top:
+            lines.append('    {cumulative:8.1f} ms  {module}'.format(cumulative=cumulative / 1000, module=module))
+    return '\n'.join(lines) + '\n'
+
+
+def _run_importtime(args):
+    report = importtime_report(args.repeat)
+    print(report, end='')
+    if args.save:
+        os.makedirs(os.path.dirname(IMPORTTIME_REPORT), exist_ok=True)
+        with open(IMPORTTIME_REPORT, 'w') as report_file:
+            report_file.write(report)
+    if args.check:
+        total, modules = _importtime(IMPORTTIME_SCENARIOS[0][1], 1)
+        loaded = [module for module in LAZY_MODULES if module in modules]
+        if loaded:
+            print('plain judge loads ' + ', '.join(loaded), file=sys.stderr)
+            return 1
+    return 0
+
+
+def synthetic_case(passengers, group=8):
+    # a shuttle between floors 1 and 2 carrying `group` passengers per trip, alternately up and down
+    input_list = ['[0.0]{pid}-FROM-{start}-TO-{end}'.format(pid=pid, start=1 + (pid - 1) // group % 2,
+                                                         end=2 - (pid - 1) // group % 2)
+                  for pid in range(1, passengers + 1)]
+    output_list = []
+    time = 0.0
+
+    def event(text):
+        output_list.append('[{time:.4f}]{text}'.format(time=time, text=text))
+
+    floor = 1
+    event('OPEN-1')
+    for begin in range(1, passengers + 1, group):
+        for pid in range(begin, min(begin + group, passengers + 1)):
+            event('IN-{pid}-{floor}'.format(pid=pid, floor=floor))
+        time += 0.4
+        event('CLOSE-{floor}'.format(floor=floor))
+        floor = 3 - floor
+        time += 0.4
+        event('ARRIVE-{floor}'.format(floor=floor))
+        event('OPEN-{floor}'.format(floor=floor))
+        for pid in range(begin, min(begin + group, passengers + 1)):
+            event('OUT-{pid}-{floor}'.format(pid=pid, floor=floor))
+    time += 0.4
+    event('CLOSE-{floor}'.format(floor=floor))
+    return input_list, output_list
+
+
+def _best_time(function, repeat):
+    best = None
+    for i in range(repeat):
+        begin_time = perf_counter()
+        function()
+        elapsed = perf_counter() - begin_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def model_report(passengers=20000, repeat=5):
+    from judge import _initialize, _initialize_passengers, bind_handlers, judge
+    from model import Elevator
+    input_list, output_list = synthetic_case(passengers)
+
+    tracemalloc.start()
+    passenger_dict = _initialize_passengers(input_list)
+    passenger_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del passenger_dict
+    passenger_dict, state_list = _initialize(input_list, output_list)
+
+    def simulate():
+        elevator = Elevator()
+        handlers = bind_handlers(elevator, _initialize_passengers(input_list))
+        for state in state_list:
+            handlers[state.state](state)
+
+    # the passenger table and the simulation, on events parsed once up front; a wrong event raises
+    simulate_time = _best_time(simulate, repeat)
+    judge_time = _best_time(lambda: judge(input_list, output_list, need_decrypt=False), repeat)
+    return '\n'.join([
+        'passengers: {count}, events: {events}'.format(count=passengers, events=len(output_list)),
+        'memory per passenger: {size:.0f} bytes'.format(size=passenger_memory / passengers),
+        'simulation per event: {cost:.3f} us'.format(cost=simulate_time / len(output_list) * 1e6),
+        'judge per event: {cost:.3f} us'.format(cost=judge_time / len(output_list) * 1e6),
+    ]) + '\n'
+
+
+def _run_model(args):
+    report = model_report(args.passengers, args.repeat)
+    print(report, end='')
+    if args.save:
+        os.makedirs(os.path.dirname(MODEL_REPORT), exist_ok=True)
+        with open(MODEL_REPORT, 'w') as report_file:
+            report_file.write(report)
+    return 0
+
+
+def events_report(events=1000000, repeat=3):
+    from judge import _initialize_passengers, _judge_vectorized, _load_judge_numpy, bind_handlers
+    from model import Elevator
+    from parse import parse_output_list
+    # about 2.4 events per passenger in the synthetic shuttle
+    input_list, output_list = synthetic_case(events * 10 // 24)
+    state_list = parse_output_list(output_list)
+    parse_time = _best_time(lambda: parse_output_list(output_list), repeat)
+
+    dispatch_time = None
+    for i in range(repeat):
+        # passengers are mutated by the simulation, so every run gets fresh ones outside of the timing
+        handlers = bind_handlers(Elevator(), _initialize_passengers(input_list))
+        begin_time = perf_counter()
+        for state in state_list:
+            handlers[state.state](state)
+        elapsed = perf_counter() - begin_time
+        dispatch_time = elapsed if dispatch_time is None else min(dispatch_time, elapsed)
+    lines = [
+        'events: {count}'.format(count=len(state_list)),
+        'parse: {rate:.0f} events/s'.format(rate=len(state_list) / parse_time),
+        'dispatch: {rate:.0f} events/s'.format(rate=len(state_list) / dispatch_time),
+    ]
+
+    judge_numpy = _load_judge_numpy()
+    if judge_numpy is not None:
+        vectorized_time = None
+        for i in range(repeat):
+            passenger_dict = _initialize_passengers(input_list)
+            begin_time = perf_counter()
+            columns = judge_numpy.event_columns(state_list)
+            _judge_vectorized(judge_numpy, state_list, columns, passenger_dict)
+            elapsed = perf_counter() - begin_time
+            vectorized_time = elapsed if vectorized_time is None else min(vectorized_time, elapsed)
+        lines.append('vectorized: {rate:.0f} events/s'.format(rate=len(state_list) / vectorized_time))
+    return '\n'.join(lines) + '\n'
+
+
+def _run_events(args):
+    report = events_report(args.events, args.repeat)
+    print(report, end='')
+    if args.save:
+        os.makedirs(os.path.dirname(EVENTS_REPORT), exist_ok=True)
+        with open(EVENTS_REPORT, 'w') as report_file:
+            report_file.write(report)
+    return 0
+
+
+def _phase_times(input_list, output_list, repeat, time_options=None, check_max_time=False):
+    # best wall time of every phase of one judgement; time_options None skips the time limit estimate
+    import check
+    from generate import format_output
+    from judge import _decrypt_aes_list, _initialize_passengers, bind_handlers
+    from model import Elevator
+    from parse import parse_output_list
+    from spj import _write_output_lines, spj_func
+
+    encrypted_output_list = format_output(output_list, encrypt=True)
+    encrypted_list = [output[output.index(']') + 1:] for output in encrypted_output_list]
+    input_text = '\n'.join(input_list) + '\n'
+    output_text = '\n'.join(encrypted_output_list) + '\n'
+    state_list = parse_output_list(output_list)
+
+    def simulate():
+        handlers = bind_handlers(Elevator(), _initialize_passengers(input_list))
+        for state in state_list:
+            handlers[state.state](state)
+
+    def end_to_end():
+        check._memory_time_cache.clear()
+        spj_func(io.StringIO(input_text), io.StringIO(output_text), check_max_time=check_max_time,
+                 need_decrypt=True, **(time_options or {}))
+
+    return {
+        'time_limit': None if time_options is None else
+        _best_time(lambda: check.get_time_report(input_list, **time_options), repeat),
+        'decrypt': _best_time(lambda: _decrypt_aes_list(encrypted_list), repeat),
+        'parse': _best_time(lambda: parse_output_list(output_list), repeat),
+        'simulate': _best_time(simulate, repeat),
+        'report': _best_time(lambda: _write_output_lines(io.StringIO(), output_list, None, 0), repeat),
+        'end_to_end': _best_time(end_to_end, repeat),
+    }
+
+
+def suite_report(data_dir='data', repeat=3, trials=None, scaling_trials=100, max_lines=None, max_requests=None,
+                 log=None):
+    from generate import generate_output, random_requests
+    time_options = {'seed': 0}
+    if trials is not None:
+        time_options['trials'] = trials
+    result = {'cases': {}, 'total': {}, 'scaling': {'lines': {}, 'requests': {}}}
+    for input_path in sorted(glob.glob(os.path.join(data_dir, '*', '*', '*', 'stdin.txt'))):
+        case = os.path.relpath(os.path.dirname(input_path), data_dir).replace(os.sep, '/')
+        with open(input_path) as input_file:
+            input_list = [line.strip() for line in input_file if line.strip()]
+        result['cases'][case] = _phase_times(input_list, generate_output(input_list), repeat, time_options, True)
+        if log:
+            log(case, result['cases'][case])
+    for phase in SUITE_PHASES:
+        result['total'][phase] = sum(times[phase] for times in result['cases'].values())
+
+    for lines in SCALING_LINES:
+        if max_lines and lines > max_lines:
+            continue
+        # about 2.4 output lines per passenger in the synthetic shuttle
+        input_list, output_list = synthetic_case(lines * 10 // 24)
+        result['scaling']['lines'][str(lines)] = _phase_times(input_list, output_list, repeat)
+        if log:
+            log('lines {count}'.format(count=lines), result['scaling']['lines'][str(lines)])
+    for requests in SCALING_REQUESTS:
+        if max_requests and requests > max_requests:
+            continue
+        input_list = random_requests(requests)
+        result['scaling']['requests'][str(requests)] = _phase_times(
+            input_list, generate_output(input_list), repeat, {'seed': 0, 'trials': scaling_trials}, True)
+        if log:
+            log('requests {count}'.format(count=requests), result['scaling']['requests'][str(requests)])
+    return result
+
+
+def _suite_metrics(result):
+    # the compared numbers: phase totals over the data cases and every point of the scaling series
+    metrics = {}
+    for phase, elapsed in result['total'].items():
+        metrics['total.' + phase] = elapsed
+    for series, points in result['scaling'].items():
+        for point, times in points.items():
+            for phase, elapsed in times.items():
+                if elapsed is not None:
+                    metrics['.'.join([series, point, phase])] = elapsed
+    return metrics
+
+
+def compare_suite(result, baseline, tolerance=0.2, min_elapsed=0.005):
+    # a slowdown counts when it is beyond the tolerance and more than min_elapsed seconds, timer noise on
+    # sub-millisecond phases is not a regression
+    current_metrics, baseline_metrics = _suite_metrics(result), _suite_metrics(baseline)
+    lines, regressions = [], []
+    for name in sorted(set(current_metrics) & set(baseline_metrics)):
+        current, base = current_metrics[name], baseline_metrics[name]
+        ratio = current / base if base else 1.0
+        regressed = ratio > 1 + tolerance and current - base > min_elapsed
+        if regressed:
+            regressions.append(name)
+        lines.append('{name:32} {current:10.4f}s {base:10.4f}s {change:+7.1%}{mark}'.format(
+            name=name, current=current, base=base, change=ratio - 1, mark='  REGRESSION' if regressed else ''))
+    return lines, regressions
+
+
+def _run_suite(args):
+    # the time limit cache would turn every estimate after the first into a lookup
+    os.environ['ELEVATOR_SPJ_CACHE_DIR'] = ''
+    result = suite_report(args.data, args.repeat, args.trials, args.scaling_trials, args.max_lines,
+                          args.max_requests, log=lambda name, times: print(name, json.dumps(times), file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(result, output_file, indent=2, sort_keys=True)
+    if args.save:
+        os.makedirs(os.path.dirname(SUITE_BASELINE), exist_ok=True)
+        with open(SUITE_BASELINE, 'w') as baseline_file:
+            json.dump(result, baseline_file, indent=2, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(json.dumps(result['total'], sort_keys=True))
+        return 0
+    with open(args.baseline) as baseline_file:
+        lines, regressions = compare_suite(result, json.load(baseline_file), args.tolerance, args.min_elapsed)
+    print('\n'.join(lines))
+    if regressions:
+        print('{count} regressions beyond {tolerance:.0%}: {names}'.format(
+            count=len(regressions), tolerance=args.tolerance, names=', '.join(regressions)), file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the elevator special judge.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    importtime_parser = subparsers.add_parser('importtime', help='cold-start import time of each judge path')
+    importtime_parser.add_argument('-r', '--repeat', type=int, default=5, help='interpreters per scenario')
+    importtime_parser.add_argument('--save', action='store_true', help='update ' + IMPORTTIME_REPORT)
+    importtime_parser.add_argument('--check', action='store_true',
+                                   help='fail if the plain judgement loads a module that should be lazy')
+    importtime_parser.set_defaults(func=_run_importtime)
+
+    model_parser = subparsers.add_parser('model', help='memory per passenger and cost per simulated event')
+    model_parser.add_argument('-n', '--passengers', type=int, default=20000, help='passengers of the synthetic case')
+    model_parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per measurement, best is kept')
+    model_parser.add_argument('--save', action='store_true', help='update ' + MODEL_REPORT)
+    model_parser.set_defaults(func=_run_model)
+
+    events_parser = subparsers.add_parser('events', help='events per second through parsing and dispatch')
+    events_parser.add_argument('-n', '--events', type=int, default=1000000, help='events of the synthetic stream')
+    events_parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per measurement, best is kept')
+    events_parser.add_argument('--save', action='store_true', help='update ' + EVENTS_REPORT)
+    events_parser.set_defaults(func=_run_events)
+
+    suite_parser = subparsers.add_parser('suite', help='per-phase timing over the test data and scaling series')
+    suite_parser.add_argument('--data', default=os.path.join(BENCH_DIR, 'data'), help='test case tree')
+    suite_parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per measurement, best is kept')
+    suite_parser.add_argument('--trials', type=int, default=None, help='time limit trials for the test data')
+    suite_parser.add_argument('--scaling-trials', type=int, default=100,
+                              help='time limit trials for the request scaling series')
+    suite_parser.add_argument('--max-lines', type=int, default=None, help='skip longer output scaling points')
+    suite_parser.add_argument('--max-requests', type=int, default=None, help='skip larger request scaling points')
+    suite_parser.add_argument('-o', '--output', help='write the JSON result here')
+    suite_parser.add_argument('-b', '--baseline', default=SUITE_BASELINE, help='JSON result to compare against')
+    suite_parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                              help='allowed slowdown against the baseline, 0.2 is 20%%')
+    suite_parser.add_argument('--min-elapsed', type=float, default=0.005,
+                              help='slowdowns of fewer seconds than this are never regressions')
+    suite_parser.add_argument('--save', action='store_true', help='store the result as the new baseline')
+    suite_parser.set_defaults(func=_run_suite)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
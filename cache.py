@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+CACHE_DIR_ENV = 'ELEVATOR_SPJ_CACHE_DIR'
+CACHE_SIZE_ENV = 'ELEVATOR_SPJ_CACHE_SIZE'
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'elevator-spj')
+DEFAULT_CACHE_SIZE = 1024
+
+
+def hash_key(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, separators=(',', ':')).encode()
+        sha.update(hashlib.sha256(part).digest())
+    return sha.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path, max_entries=DEFAULT_CACHE_SIZE):
+        self.__path = path
+        self.__max_entries = max_entries
+        # sqlite connections must not be shared between threads (server.py) nor forked judge processes
+        self.__local = threading.local()
+        self.__disabled = False
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def __connect(self):
+        connection = getattr(self.__local, 'connection', None)
+        if connection is not None and self.__local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self.__path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.__path, timeout=30.0, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS entries ('
+                           'key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access INTEGER NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS clock (id INTEGER PRIMARY KEY CHECK (id = 0), tick INTEGER)')
+        connection.execute('INSERT OR IGNORE INTO clock (id, tick) VALUES (0, 0)')
+        self.__local.connection = connection
+        self.__local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def __tick(connection):
+        # a shared logical clock keeps the LRU order consistent across processes
+        connection.execute('UPDATE clock SET tick = tick + 1 WHERE id = 0')
+        return connection.execute('SELECT tick FROM clock WHERE id = 0').fetchone()[0]
+
+    @staticmethod
+    def __count(connection, name):
+        connection.execute('INSERT OR IGNORE INTO stats (name, value) VALUES (?, 0)', (name,))
+        connection.execute('UPDATE stats SET value = value + 1 WHERE name = ?', (name,))
+
+    def __transaction(self, func):
+        if self.__disabled:
+            return None
+        try:
+            connection = self.__connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(connection)
+                connection.execute('COMMIT')
+                return result
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        except (sqlite3.Error, OSError):
+            # an unusable cache must never break a judgement, fall back to computing
+            self.__disabled = True
+            return None
+
+    def get(self, key):
+        def _get(connection):
+            row = connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.__count(connection, 'misses')
+                return None
+            connection.execute('UPDATE entries SET last_access = ? WHERE key = ?',
+                               (self.__tick(connection), key))
+            self.__count(connection, 'hits')
+            return row[0]
+
+        value = self.__transaction(_get)
+        if value is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        return json.loads(value)
+
+    def put(self, key, value):
+        def _put(connection):
+            connection.execute('INSERT OR REPLACE INTO entries (key, value, last_access) VALUES (?, ?, ?)',
+                               (key, json.dumps(value), self.__tick(connection)))
+            connection.execute('DELETE FROM entries WHERE key NOT IN '
+                               '(SELECT key FROM entries ORDER BY last_access DESC LIMIT ?)',
+                               (self.__max_entries,))
+
+        self.__transaction(_put)
+
+    def stats(self):
+        def _stats(connection):
+            _result = {name: value for name, value in connection.execute('SELECT name, value FROM stats')}
+            _result['entries'] = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            return _result
+
+        result = {'hits': 0, 'misses': 0, 'entries': 0}
+        result.update(self.__transaction(_stats) or {})
+        result.update({'process_hits': self.__hits, 'process_misses': self.__misses})
+        return result
+
+    def clear(self):
+        def _clear(connection):
+            connection.execute('DELETE FROM entries')
+            connection.execute('DELETE FROM stats')
+
+        self.__transaction(_clear)
+
+
+def open_cache(name):
+    directory = os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+    if not directory:
+        return None
+    max_entries = int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE))
+    return DiskCache(os.path.join(directory, name + '.sqlite3'), max_entries)
+
+
+if __name__ == '__main__':
+    _cache = open_cache('time_limit')
+    print(_cache.path if _cache else 'cache disabled', _cache.stats() if _cache else '')
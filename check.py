@@ -1,8 +1,18 @@
-import copy
+import hashlib
+import json
 import math
 import os
 import random
 import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from cache import hash_key, open_cache
+from metrics import count
 
 
 def _parse_input(request):
@@ -17,6 +27,10 @@ def _parse_input(request):
     return {'time': time, 'pid': pid, 'start': start, 'end': end, 'served': False, 'original': request}
 
 
+max_request_count = 30
+max_base_time = 170.0
+
+
 def _check_validity(request_list):
     last_time = 0.0
     valid_request_count = 0
@@ -42,7 +56,7 @@ def _check_validity(request_list):
         valid_request_count += 1
     if valid_request_count < 1:
         raise ValueError("There is no valid request")
-    if valid_request_count > 30:
+    if valid_request_count > max_request_count:
         raise ValueError('Too many valid requests')
 
 
@@ -55,12 +69,22 @@ request_time_disturb_lower_bound = -0.1
 basement_floor_count = 3
 
 
-def _simulate(request_list, run_timespan, serve_timespan):
+def _simulate(request_list, run_timespan, serve_timespan, request_disturbs=None):
     # pre-treat requests: reset request time and add floor count to basement floors
+    request_count = len(request_list)
+    request_times = [0.0] * request_count
+    request_starts = [0] * request_count
+    request_ends = [0] * request_count
+    # pending[direction][floor] lists unserved requests by index; their times never decrease along a list
+    pending = ([[] for i in range(19)], [[] for i in range(19)])
     last_request_random_time = 0.0
     for index, request in enumerate(request_list):
         request_real_time = request['time']
-        request_random_disturb = random.uniform(request_time_disturb_upper_bound, request_time_disturb_lower_bound)
+        if request_disturbs is None:
+            request_random_disturb = random.uniform(request_time_disturb_upper_bound,
+                                                    request_time_disturb_lower_bound)
+        else:
+            request_random_disturb = request_disturbs[index]
         if index == 0:
             request_time = max(0, request_real_time + request_random_disturb)
         else:
@@ -68,130 +92,532 @@ def _simulate(request_list, run_timespan, serve_timespan):
                 max(last_request_random_time, request_real_time) + request_random_disturb,
                 last_request_random_time)
         last_request_random_time = request_time
-        request['time'] = request_time
-        if request['start'] < 0:
-            request['start'] += 1
-        if request['end'] < 0:
-            request['end'] += 1
-        request['start'] += basement_floor_count - 1
-        request['end'] += basement_floor_count - 1
-
-    pickup_request_bundle = []
+        start = request['start']
+        end = request['end']
+        if start < 0:
+            start += 1
+        if end < 0:
+            end += 1
+        start += basement_floor_count - 1
+        end += basement_floor_count - 1
+        request_times[index] = request_time
+        request_starts[index] = start
+        request_ends[index] = end
+        if start != end:
+            pending[end > start][start].append(index)
+
+    served = bytearray(request_count)
+    pending_heads = ([0] * 19, [0] * 19)
+    unserved_count = request_count
+    first_unserved = 0
     last_request_finish_time = 0.0
     floor = basement_floor_count
+    checkpoint_time = [0.0] * 19
+    checkpoint_served = [False] * 19
+
+    def __serve(_index):
+        # requests are always served from the head of their pending list
+        if request_starts[_index] != request_ends[_index]:
+            pending_heads[request_ends[_index] > request_starts[_index]][request_starts[_index]] += 1
+        served[_index] = 1
 
     def __build_basic_time(_time, _start, _end):
         base_time = _time + serve_timespan + run_timespan * abs(_start - floor)
-        floor_time_checkpoints[_start]['served'] = True
-        floor_time_checkpoints[_start]['time'] = base_time
+        checkpoint_served[_start] = True
+        checkpoint_time[_start] = base_time
         for i in range(_start, _end, int(math.copysign(1, _end - _start))):
-            floor_time_checkpoints[i]['time'] = base_time + run_timespan * abs(i - _start)
-        floor_time_checkpoints[_end]['served'] = True
-        floor_time_checkpoints[_end]['time'] = base_time + run_timespan * abs(_end - _start) + serve_timespan
+            checkpoint_time[i] = base_time + run_timespan * abs(i - _start)
+        checkpoint_served[_end] = True
+        checkpoint_time[_end] = base_time + run_timespan * abs(_end - _start) + serve_timespan
 
     def __update_pickup_time(_start, _end, _travel_end):
         direction = int(math.copysign(1, _end - _start))
-        base_update_time = floor_time_checkpoints[_travel_end]['time']
+        base_update_time = checkpoint_time[_travel_end]
         for i in range(_travel_end, _end + direction, direction):
             if i != _travel_end:
                 base_update_time += run_timespan
-                floor_time_checkpoints[i]['time'] = base_update_time
+                checkpoint_time[i] = base_update_time
         base_update_time = 0.0
-        if not floor_time_checkpoints[_start]['served']:
+        if not checkpoint_served[_start]:
             base_update_time += serve_timespan
-            floor_time_checkpoints[_start]['served'] = True
+            checkpoint_served[_start] = True
         for i in range(_start, _end + direction, direction):
-            floor_time_checkpoints[i]['time'] += base_update_time
-        if not floor_time_checkpoints[_end]['served']:
+            checkpoint_time[i] += base_update_time
+        if not checkpoint_served[_end]:
             base_update_time += serve_timespan
-            floor_time_checkpoints[_end]['served'] = True
+            checkpoint_served[_end] = True
         for i in range(_end, _travel_end + direction, direction):
-            floor_time_checkpoints[i]['time'] += base_update_time
+            checkpoint_time[i] += base_update_time
         if _start < _end < _travel_end or _travel_end < _end < _start:
-            if not floor_time_checkpoints[_travel_end]['served']:
-                floor_time_checkpoints[_travel_end]['served'] = True
-                floor_time_checkpoints[_travel_end]['time'] += serve_timespan
-
-    while not all([request['served'] for request in request_list]):
-        floor_time_checkpoints = [{'served': False, 'time': 0.0} for i in range(19)]
-        if pickup_request_bundle:
-            main_request = pickup_request_bundle.pop(0)
-            pickup_request_bundle = []
-        else:
-            main_request = next(request for request in request_list if not request['served'])
-        time = max(last_request_finish_time, main_request['time'])
-        start = main_request['start']
-        end = main_request['end']
+            if not checkpoint_served[_travel_end]:
+                checkpoint_served[_travel_end] = True
+                checkpoint_time[_travel_end] += serve_timespan
+
+    def __next_pickup(_low, _high, _up):
+        # the head of each pending list is its earliest request, so only heads need to be checked
+        _pending = pending[_up]
+        _heads = pending_heads[_up]
+        pickup = None
+        for i in range(_low, _high + 1):
+            if _heads[i] < len(_pending[i]):
+                candidate = _pending[i][_heads[i]]
+                if request_times[candidate] <= checkpoint_time[i] and (pickup is None or candidate < pickup):
+                    pickup = candidate
+        return pickup
+
+    while unserved_count:
+        for i in range(19):
+            checkpoint_time[i] = 0.0
+            checkpoint_served[i] = False
+        while served[first_unserved]:
+            first_unserved += 1
+        # every picked up request lies inside the main request's range and is served along with it,
+        # so the next main request is always the first unserved one
+        main_request = first_unserved
+        __serve(main_request)
+        unserved_count -= 1
+        time = max(last_request_finish_time, request_times[main_request])
+        start = request_starts[main_request]
+        end = request_ends[main_request]
         __build_basic_time(time, start, end)
         travel_end = end
-        while True:
-            next_pickup_request = next((request for request in request_list
-                                        if not request['served'] and
-                                        request not in pickup_request_bundle and
-                                        request is not main_request and
-                                        min(start, end) <= request['start'] <= max(start, end) and
-                                        (end - start) * (request['end'] - request['start']) > 0 and
-                                        request['time'] <= floor_time_checkpoints[request['start']]['time']), None)
-            if not next_pickup_request:
+        low, high, up = min(start, end), max(start, end), end > start
+        while start != end:
+            next_pickup_request = __next_pickup(low, high, up)
+            if next_pickup_request is None:
                 break
-            __update_pickup_time(next_pickup_request['start'], next_pickup_request['end'], travel_end)
-            travel_end = max(travel_end, next_pickup_request['end']) if end > start \
-                else min(travel_end, next_pickup_request['end'])
-            pickup_request_bundle.append(next_pickup_request)
-        for request in pickup_request_bundle:
-            if min(start, end) <= request['start'] <= max(start, end):
-                request['served'] = True
-        pickup_request_bundle = [request for request in pickup_request_bundle if not request['served']]
-        main_request['served'] = True
-        last_request_finish_time = floor_time_checkpoints[travel_end]['time']
+            pickup_end = request_ends[next_pickup_request]
+            __update_pickup_time(request_starts[next_pickup_request], pickup_end, travel_end)
+            travel_end = max(travel_end, pickup_end) if up else min(travel_end, pickup_end)
+            __serve(next_pickup_request)
+            unserved_count -= 1
+        last_request_finish_time = checkpoint_time[travel_end]
         floor = travel_end
 
     time = last_request_finish_time
     return time
 
 
-def _calculate_time(request_list):
-    max_time = 0.0
-    for i in range(5000):
-        run_timespan = base_run_timespan + random.uniform(0, run_timespan_disturb)
-        serve_timespan = base_serve_timespan + random.uniform(0, serve_timespan_disturb)
-        time = _simulate(copy.deepcopy(request_list), run_timespan, serve_timespan)
-        if time > max_time:
-            max_time = time
+def _sample_uniform(rng, trials, dimension, begin, plan):
+    return [[rng.random() for j in range(dimension)] for i in range(trials)]
+
+
+def _plan_latin_hypercube(rng, trials, dimension):
+    # over the whole run every dimension hits each of the `trials` equal strata exactly once: one random
+    # permutation of the strata per dimension, shuffled only as far as the chunks reach (an adaptive run
+    # mostly stops long before its last trial)
+    return trials, [(random.Random(rng.getrandbits(64)), {}, array('l')) for j in range(dimension)]
+
+
+def _extend_permutation(total, permutation, count):
+    # Fisher-Yates on a virtual range(total), the positions moved so far are kept in `moved`
+    rng, moved, strata = permutation
+    for i in range(len(strata), count):
+        j = rng.randrange(i, total)
+        strata.append(moved.get(j, j))
+        moved[j] = moved.pop(i, i)
+
+
+def _sample_latin_hypercube(rng, trials, dimension, begin, plan):
+    # plan: the run's trial count and the strata of this chunk's points in every dimension
+    total, columns = plan
+    return [[(stratum + rng.random()) / total for stratum in point] for point in zip(*columns)]
+
+
+def _primes(count):
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % prime for prime in primes if prime * prime <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def _radical_inverse(index, base):
+    inverse, fraction = 0.0, 1.0 / base
+    while index:
+        index, digit = divmod(index, base)
+        inverse += digit * fraction
+        fraction /= base
+    return inverse
+
+
+def _plan_halton(rng, trials, dimension):
+    # one random (Cranley-Patterson) shift for the whole run
+    return [rng.random() for j in range(dimension)]
+
+
+def _sample_halton(rng, trials, dimension, begin, plan):
+    # points begin .. begin + trials of the shifted Halton sequence
+    bases = _primes(dimension)
+    return [[(_radical_inverse(index + 1, base) + shift) % 1.0 for base, shift in zip(bases, plan)]
+            for index in range(begin, begin + trials)]
+
+
+samplers = {
+    'uniform': _sample_uniform,
+    'lhs': _sample_latin_hypercube,
+    'halton': _sample_halton,
+}
+# what the samplers share over all chunks of a run, drawn once from the master seed
+sampler_plans = {
+    'lhs': _plan_latin_hypercube,
+    'halton': _plan_halton,
+}
+
+
+def _sample_plan(sampler, rng, trials, dimension):
+    plan = sampler_plans.get(sampler)
+    return plan(rng, trials, dimension) if plan else None
+
+
+def _chunk_plan(sampler, plan, begin, trials):
+    # a chunk only needs the latin hypercube strata of its own points
+    if sampler == 'lhs':
+        total, permutations = plan
+        for permutation in permutations:
+            _extend_permutation(total, permutation, begin + trials)
+        return total, [strata[begin:begin + trials] for rng, moved, strata in permutations]
+    return plan
+
+
+def _corner_points(dimension):
+    # slowest and fastest timespans combined with all requests coming as early or as late as possible
+    return [[run, serve] + [disturb] * (dimension - 2)
+            for run in (1.0, 0.0) for serve in (1.0, 0.0) for disturb in (0.0, 1.0)]
+
+
+def _draw_samples(request_list, trials, rng=random, sampler='uniform', begin=0, plan=None):
+    if sampler not in samplers:
+        raise ValueError('Unknown sampler: ' + str(sampler))
+    dimension = 2 + len(request_list)
+    if plan is None:
+        plan = _chunk_plan(sampler, _sample_plan(sampler, rng, trials, dimension), begin, trials)
+    points = samplers[sampler](rng, trials, dimension, begin, plan)
+    if sampler != 'uniform' and begin == 0:
+        corners = _corner_points(dimension)[:trials]
+        points[:len(corners)] = corners
+    disturb_span = request_time_disturb_upper_bound - request_time_disturb_lower_bound
+    run_timespans = [base_run_timespan + point[0] * run_timespan_disturb for point in points]
+    serve_timespans = [base_serve_timespan + point[1] * serve_timespan_disturb for point in points]
+    request_disturbs = [[request_time_disturb_lower_bound + u * disturb_span for u in point[2:]] for point in points]
+    return run_timespans, serve_timespans, request_disturbs
+
+
+def _simulate_trials(request_list, run_timespans, serve_timespans, request_disturbs):
+    return [_simulate(request_list, run_timespan, serve_timespan, request_disturb)
+            for run_timespan, serve_timespan, request_disturb in zip(run_timespans, serve_timespans, request_disturbs)]
+
+
+def _simulate_trials_numpy(request_list, run_timespans, serve_timespans, request_disturbs):
+    from check_numpy import simulate_trials
+    return simulate_trials(request_list, run_timespans, serve_timespans, request_disturbs)
+
+
+simulate_engines = {
+    'python': _simulate_trials,
+    'numpy': _simulate_trials_numpy,
+}
+
+
+default_trials = 5000
+chunk_trials = 250
+parallel_trial_threshold = 1000
+
+
+def _chunk_seed(seed, chunk):
+    # chunk seeds only depend on the master seed, so the result does not depend on the worker count
+    digest = hashlib.sha256((str(seed) + ':' + str(chunk)).encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def _run_plan(request_list, trials, sampler, seed):
+    return _sample_plan(sampler, random.Random(_chunk_seed(seed, 'plan')), trials, 2 + len(request_list))
+
+
+def _chunk(request_list, trials, index, engine, sampler, seed, plan):
+    begin = index * chunk_trials
+    count = min(chunk_trials, trials - begin)
+    return request_list, count, engine, sampler, _chunk_seed(seed, index), begin, \
+        _chunk_plan(sampler, plan, begin, count)
+
+
+def _simulate_chunk(request_list, trials, engine, sampler, seed, begin, plan):
+    rng = random.Random(seed)
+    times = simulate_engines[engine](request_list, *_draw_samples(request_list, trials, rng, sampler, begin, plan))
+    return float(max(times))
+
+
+def _calculate_max_time(request_list, trials, engine, sampler, workers, seed):
+    if seed is None:
+        seed = random.getrandbits(64)
+    plan = _run_plan(request_list, trials, sampler, seed)
+    chunks = [_chunk(request_list, trials, index, engine, sampler, seed, plan)
+              for index in range((trials + chunk_trials - 1) // chunk_trials)]
+    if workers <= 1 or trials < parallel_trial_threshold:
+        chunk_max_times = [_simulate_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            chunk_max_times = list(executor.map(_simulate_chunk, *zip(*chunks)))
+    return max(chunk_max_times)
+
+
+adaptive_max_trials = 50000
+adaptive_min_batches = 8
+default_tolerance = 0.05
+euler_gamma = 0.5772156649015329
+
+
+def _extreme_value_improvement(batch_max_times, max_time):
+    # fit a generalized extreme value law to the batch maxima by probability weighted moments (Hosking, 1985),
+    # then predict how far the running max would still move if the number of trials were doubled:
+    # E[max(X, max_time)] - max_time, X being the max of as many new batches
+    count = len(batch_max_times)
+    ordered = sorted(batch_max_times)
+    b0 = sum(ordered) / count
+    b1 = sum(i * x for i, x in enumerate(ordered)) / (count * (count - 1))
+    b2 = sum(i * (i - 1) * x for i, x in enumerate(ordered)) / (count * (count - 1) * (count - 2))
+    if 2 * b1 - b0 <= 0.0 or 3 * b2 - b0 <= 0.0:
+        return 0.0
+    c = (2 * b1 - b0) / (3 * b2 - b0) - math.log(2) / math.log(3)
+    shape = 7.8590 * c + 2.9554 * c * c
+    if abs(shape) < 1e-6:
+        scale = (2 * b1 - b0) / math.log(2)
+        location = b0 - euler_gamma * scale + scale * math.log(count)
+
+        def _tail(x):
+            return -math.expm1(-math.exp(min(700.0, -(x - location) / scale)))
+    else:
+        scale = (2 * b1 - b0) * shape / (math.gamma(1 + shape) * (1 - 2 ** -shape))
+        location = b0 + scale * (math.gamma(1 + shape) - 1) / shape
+        location, scale = location + scale * (1 - count ** -shape) / shape, scale * count ** -shape
+
+        def _tail(x):
+            y = 1 - shape * (x - location) / scale
+            if y <= 0.0:
+                return 0.0 if shape > 0 else 1.0
+            return -math.expm1(-math.exp(min(700.0, math.log(y) / shape)))
+
+    step = scale / 16
+    improvement = 0.0
+    x = max_time + step / 2
+    while True:
+        tail = _tail(x)
+        improvement += tail * step
+        if (x > location and tail < 1e-9) or x > max_time + 1000 * scale:
+            return improvement
+        x += step
+
+
+def _calculate_max_time_adaptive(request_list, trials, engine, sampler, workers, seed, tolerance, budget):
+    if seed is None:
+        seed = random.getrandbits(64)
+    begin_time = perf_counter()
+    chunk_count = (trials + chunk_trials - 1) // chunk_trials
+    batch_max_times = []
+    improvement = None
+    reason = 'max_trials'
+    plan = _run_plan(request_list, trials, sampler, seed)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while len(batch_max_times) < chunk_count:
+            indexes = range(len(batch_max_times), min(chunk_count, len(batch_max_times) + workers))
+            chunks = [_chunk(request_list, trials, index, engine, sampler, seed, plan) for index in indexes]
+            if executor is None:
+                batch_max_times.extend(_simulate_chunk(*chunk) for chunk in chunks)
+            else:
+                batch_max_times.extend(executor.map(_simulate_chunk, *zip(*chunks)))
+            if len(batch_max_times) >= adaptive_min_batches:
+                improvement = _extreme_value_improvement(batch_max_times, max(batch_max_times))
+                if improvement < tolerance:
+                    reason = 'converged'
+                    break
+            if budget is not None and perf_counter() - begin_time >= budget:
+                reason = 'budget'
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    report = {
+        'trials': min(trials, len(batch_max_times) * chunk_trials),
+        'elapsed': perf_counter() - begin_time,
+        'reason': reason,
+        'improvement': improvement,
+    }
+    return max(batch_max_times), report
+
+
+def _calculate_time_report(request_list, trials=None, engine='python', sampler='uniform', workers=1, seed=None,
+                           adaptive=False, tolerance=default_tolerance, budget=None):
+    if engine not in simulate_engines:
+        raise ValueError('Unknown simulate engine: ' + str(engine))
+    if sampler not in samplers:
+        raise ValueError('Unknown sampler: ' + str(sampler))
+    if trials is None:
+        trials = adaptive_max_trials if adaptive else default_trials
+    if trials < 1:
+        raise ValueError('Trial count must be positive')
+    if not workers:
+        workers = os.cpu_count() or 1
+    if adaptive:
+        max_time, report = _calculate_max_time_adaptive(request_list, trials, engine, sampler, workers, seed,
+                                                         tolerance, budget)
+    else:
+        begin_time = perf_counter()
+        max_time = _calculate_max_time(request_list, trials, engine, sampler, workers, seed)
+        report = {'trials': trials, 'elapsed': perf_counter() - begin_time, 'reason': 'fixed', 'improvement': None}
+    max_time = max(0.0, max_time)
+    report['max_simulated_time'] = max_time
+    count('trials', report['trials'])
     # return max_time, max(max_time + 3, 1.05 * max_time)
-    return math.ceil(max_time), math.ceil(max(max_time + 3, 1.05 * max_time)) + 5
+    return math.ceil(max_time), _time_limit(max_time), report
+
+
+def _calculate_time(request_list, **options):
+    base_time, max_time, report = _calculate_time_report(request_list, **options)
+    return base_time, max_time
+
+
+def _time_limit(max_time):
+    return math.ceil(max(max_time + 3, 1.05 * max_time)) + 5
+
+
+def _floor_distance(start, end):
+    if start < 0:
+        start += 1
+    if end < 0:
+        end += 1
+    return abs(end - start)
+
+
+def _simulated_time_bounds(request_list):
+    # every trial ends after each request has been disturbed as early as possible and carried at full speed,
+    # and after the elevator has swept from floor 1 over every requested floor with at least two services
+    lower_time = max(max(0.0, request['time'] + request_time_disturb_lower_bound) +
+                     base_run_timespan * _floor_distance(request['start'], request['end'])
+                     for request in request_list)
+    floors = [floor for request in request_list for floor in (request['start'], request['end'])] + [1]
+    lowest_floor, highest_floor = min(floors), max(floors)
+    sweep_distance = _floor_distance(lowest_floor, highest_floor) + \
+        min(_floor_distance(lowest_floor, 1), _floor_distance(1, highest_floor))
+    first_time = max(0.0, request_list[0]['time'] + request_time_disturb_lower_bound)
+    lower_time = max(lower_time, first_time + base_run_timespan * sweep_distance + 2 * base_serve_timespan)
+    # and before the latest disturbed request time plus every request served on its own with the
+    # slowest timespans: the elevator never leaves the requested floors (and floor 1), so each request
+    # costs at most one sweep of them to reach it, its own distance and 3 door services
+    count = len(request_list)
+    latest_time = max(request['time'] for request in request_list) + request_time_disturb_upper_bound * count
+    floor_span = _floor_distance(lowest_floor, highest_floor)
+    longest_run = (base_run_timespan + run_timespan_disturb) * \
+        sum(floor_span + _floor_distance(request['start'], request['end']) for request in request_list)
+    longest_serve = (base_serve_timespan + serve_timespan_disturb) * 3 * count
+    upper_time = latest_time + longest_run + longest_serve
+    return lower_time, upper_time
+
+
+def _calculate_time_bounds(request_list):
+    lower_time, upper_time = _simulated_time_bounds(request_list)
+    return _time_limit(lower_time), _time_limit(upper_time)
+
+
+def _time_cache_key(request_list, options):
+    normalized = [[request['time'], request['start'], request['end']] for request in request_list]
+    disturbance = [base_run_timespan, base_serve_timespan, run_timespan_disturb, serve_timespan_disturb,
+                   request_time_disturb_upper_bound, request_time_disturb_lower_bound, basement_floor_count]
+    # the engine and the worker count never change the estimate, everything else may
+    options = {name: value for name, value in options.items() if name not in ('engine', 'workers')}
+    return hash_key('time_limit', normalized, disturbance, options)
+
+
+_time_cache = None
+# long-running judges (batch.py, server.py) keep recent time limits in memory in front of the disk cache
+_memory_time_cache = OrderedDict()
+memory_time_cache_size = 256
+_memory_time_cache_lock = threading.Lock()
+
+
+def _get_time_cache():
+    global _time_cache
+    if _time_cache is None:
+        _time_cache = open_cache('time_limit') or False
+    return _time_cache or None
+
+
+def _cached_calculate_time(request_list, **options):
+    key = _time_cache_key(request_list, options)
+    with _memory_time_cache_lock:
+        result = _memory_time_cache.get(key)
+        if result is not None:
+            _memory_time_cache.move_to_end(key)
+    if result is not None:
+        count('time_cache_memory_hits')
+        return result
+    time_cache = _get_time_cache()
+    cached = time_cache.get(key) if time_cache is not None else None
+    if cached is not None:
+        count('time_cache_disk_hits')
+        result = tuple(cached)
+    else:
+        count('time_cache_misses')
+        result = _calculate_time(request_list, **options)
+        if time_cache is not None:
+            time_cache.put(key, list(result))
+    with _memory_time_cache_lock:
+        _memory_time_cache[key] = result
+        while len(_memory_time_cache) > memory_time_cache_size:
+            _memory_time_cache.popitem(last=False)
+    return result
 
 
 def _parse_request_list(input_list):
     return [_parse_input(request.rstrip()) for request in input_list]
 
 
-def _check_input_validity(input_list):
+def _check_input_validity(input_list, **options):
     try:
         request_list = _parse_request_list(input_list)
         _check_validity(request_list)
-        base_time, max_time = _calculate_time(request_list)
-        if base_time >= 170.0:
+        base_time, max_time = _cached_calculate_time(request_list, **options)
+        if base_time >= max_base_time:
             raise ValueError('Request execute time too long')
         return True, 'Your input is valid, base time is ' + str(base_time) + ', max time is ' + str(max_time)
     except ValueError as e:
         return False, str(e)
 
 
-def get_base_and_max_time(input_list):
+def get_base_and_max_time(input_list, **options):
+    request_list = _parse_request_list(input_list)
+    return _cached_calculate_time(request_list, **options)
+
+
+def get_time_report(input_list, **options):
+    request_list = _parse_request_list(input_list)
+    base_time, max_time, report = _calculate_time_report(request_list, **options)
+    report.update({'base_time': base_time, 'max_time': max_time})
+    return report
+
+
+def get_max_time_bounds(input_list):
     request_list = _parse_request_list(input_list)
-    return _calculate_time(request_list)
+    return _calculate_time_bounds(request_list)
 
 
-def check(input_file_path):
+def check(input_file_path, **options):
     input_list = []
     if not os.path.exists(input_file_path):
         raise FileNotFoundError
     with open(input_file_path) as f:
         for line in f:
             input_list.append(line)
-        return _check_input_validity(input_list)
+        return _check_input_validity(input_list, **options)
 
 
 if __name__ == '__main__':
-    print(check('stdin.txt'))
+    if len(sys.argv) > 1:
+        # python check.py data/public/strong/*/stdin.txt  -- report how the adaptive estimate converges
+        for _input_file_path in sys.argv[1:]:
+            with open(_input_file_path) as _input_file:
+                print(_input_file_path, json.dumps(get_time_report(_input_file.readlines(), adaptive=True)))
+    else:
+        print(check('stdin.txt'))
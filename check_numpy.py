@@ -0,0 +1,133 @@
+import numpy as np
+
+from check import basement_floor_count
+
+floor_count = basement_floor_count + 16
+floors = np.arange(floor_count)
+
+
+def _floor_index(floor):
+    if floor < 0:
+        floor += 1
+    return floor + basement_floor_count - 1
+
+
+def _between(start, end, direction):
+    # floors from start to end (both inclusive) walking in the given direction, one row per trial
+    return ((floors - start[:, None]) * direction[:, None] >= 0) & \
+           ((end[:, None] - floors) * direction[:, None] >= 0)
+
+
+def _take(matrix, index):
+    return np.take_along_axis(matrix, index[:, None], axis=1)[:, 0]
+
+
+def _disturb_request_times(request_times, request_disturbs):
+    disturbed = np.empty_like(request_disturbs)
+    disturbed[:, 0] = np.maximum(0, request_times[0] + request_disturbs[:, 0])
+    for index in range(1, request_times.shape[0]):
+        last = disturbed[:, index - 1]
+        disturbed[:, index] = np.maximum(np.maximum(last, request_times[index]) + request_disturbs[:, index], last)
+    return disturbed
+
+
+def _update_pickup_time(checkpoint_time, checkpoint_served, trials, start, end, travel_end,
+                        run_timespan, serve_timespan):
+    # same arithmetic as check._simulate.__update_pickup_time, applied to the selected trials at once
+    direction = np.sign(end - start)
+    time = checkpoint_time[trials]
+    served = checkpoint_served[trials]
+    row = np.arange(trials.shape[0])
+
+    beyond = _between(travel_end, end, direction) & (floors != travel_end[:, None])
+    travel_end_time = _take(time, travel_end)
+    time = np.where(beyond, travel_end_time[:, None] + run_timespan[:, None] *
+                    np.abs(floors - travel_end[:, None]), time)
+
+    start_update = np.where(_take(served, start), 0.0, serve_timespan)
+    served[row, start] = True
+    time += np.where(_between(start, end, direction), start_update[:, None], 0.0)
+
+    end_update = start_update + np.where(_take(served, end), 0.0, serve_timespan)
+    served[row, end] = True
+    time += np.where(_between(end, travel_end, direction), end_update[:, None], 0.0)
+
+    passing = ((start < end) & (end < travel_end)) | ((travel_end < end) & (end < start))
+    passing &= ~_take(served, travel_end)
+    served[row[passing], travel_end[passing]] = True
+    time[row[passing], travel_end[passing]] += serve_timespan[passing]
+
+    checkpoint_time[trials] = time
+    checkpoint_served[trials] = served
+
+
+def simulate_trials(request_list, run_timespans, serve_timespans, request_disturbs):
+    run_timespans = np.asarray(run_timespans, dtype=float)
+    serve_timespans = np.asarray(serve_timespans, dtype=float)
+    request_times = np.array([request['time'] for request in request_list], dtype=float)
+    request_starts = np.array([_floor_index(request['start']) for request in request_list])
+    request_ends = np.array([_floor_index(request['end']) for request in request_list])
+    request_times = _disturb_request_times(request_times, np.asarray(request_disturbs, dtype=float))
+
+    trial_count, request_count = request_times.shape
+    trial_index = np.arange(trial_count)
+    request_index = np.arange(request_count)
+    request_served = np.zeros((trial_count, request_count), dtype=bool)
+    last_request_finish_time = np.zeros(trial_count)
+    floor = np.full(trial_count, basement_floor_count)
+
+    # every trial is advanced in lockstep, one main request per outer iteration
+    active = trial_index
+    while active.shape[0]:
+        served = request_served[active]
+        # pickups always lie inside the main request's range, so the next main request is the first unserved one
+        main_request = np.argmax(~served, axis=1)
+        run_timespan = run_timespans[active]
+        serve_timespan = serve_timespans[active]
+        start = request_starts[main_request]
+        end = request_ends[main_request]
+        direction = np.where(end >= start, 1, -1)
+        time = np.maximum(last_request_finish_time[active], _take(request_times[active], main_request))
+
+        base_time = time + serve_timespan + run_timespan * np.abs(start - floor[active])
+        checkpoint_time = np.where(_between(start, end - direction, direction),
+                                   base_time[:, None] + run_timespan[:, None] * np.abs(floors - start[:, None]),
+                                   0.0)
+        checkpoint_time[trial_index[:active.shape[0]], end] = \
+            base_time + run_timespan * np.abs(end - start) + serve_timespan
+        checkpoint_served = np.zeros((active.shape[0], floor_count), dtype=bool)
+        checkpoint_served[trial_index[:active.shape[0]], start] = True
+        checkpoint_served[trial_index[:active.shape[0]], end] = True
+
+        travel_end = end.copy()
+        bundle = np.zeros_like(served)
+        low, high = np.minimum(start, end), np.maximum(start, end)
+        candidate = ~served & (request_index != main_request[:, None]) & \
+            (low[:, None] <= request_starts) & (request_starts <= high[:, None]) & \
+            ((end - start)[:, None] * (request_ends - request_starts) > 0)
+        searching = np.arange(active.shape[0])
+        while searching.shape[0]:
+            reachable = candidate[searching] & ~bundle[searching] & \
+                (request_times[active[searching]] <= checkpoint_time[searching][:, request_starts])
+            found = reachable.any(axis=1)
+            searching = searching[found]
+            if not searching.shape[0]:
+                break
+            pickup = np.argmax(reachable[found], axis=1)
+            pickup_start = request_starts[pickup]
+            pickup_end = request_ends[pickup]
+            _update_pickup_time(checkpoint_time, checkpoint_served, searching, pickup_start, pickup_end,
+                                travel_end[searching], run_timespan[searching], serve_timespan[searching])
+            travel_end[searching] = np.where(end[searching] > start[searching],
+                                             np.maximum(travel_end[searching], pickup_end),
+                                             np.minimum(travel_end[searching], pickup_end))
+            bundle[searching, pickup] = True
+
+        served |= bundle
+        served[trial_index[:active.shape[0]], main_request] = True
+        request_served[active] = served
+        last_request_finish_time[active] = _take(checkpoint_time, travel_end)
+        floor[active] = travel_end
+        active = active[~served.all(axis=1)]
+
+    return last_request_finish_time
@@ -0,0 +1,129 @@
+import mmap
+import os
+import struct
+import sys
+
+from cache import CACHE_DIR_ENV, DEFAULT_CACHE_DIR, hash_key
+from parse import Event
+
+# one file per output: a header, then the columns back to back, the 8 byte ones first so that every column
+# starts aligned and can be mapped as a typed array (e.g. numpy.frombuffer on the mapped file)
+FORMAT_VERSION = 1
+_MAGIC = b'ESPJEV' + bytes([FORMAT_VERSION]) + (b'<' if sys.byteorder == 'little' else b'>')
+_HEADER = struct.Struct('=8sQQQ')
+# name, array type code, item size, items per event (text_offsets has one more item than there are events)
+_COLUMNS = [
+    ('time', 'd', 8),
+    ('pid', 'q', 8),
+    ('text_offsets', 'q', 8),
+    ('elevator', 'h', 2),
+    ('state', 'B', 1),
+    ('floor', 'b', 1),
+]
+_STATES = ('OPEN', 'CLOSE', 'ARRIVE', 'IN', 'OUT')
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+
+
+def events_directory():
+    directory = os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+    return os.path.join(directory, 'events') if directory else None
+
+
+def events_key(output_list, need_decrypt, multi_elevator=False):
+    # the raw output as the judge receives it, decrypted and plain outputs are parsed differently, and so are
+    # outputs with and without car ids
+    return hash_key('events', FORMAT_VERSION, bool(need_decrypt), bool(multi_elevator), '\n'.join(output_list))
+
+
+def _events_path(directory, key):
+    return os.path.join(directory, key[:2], key + '.bin')
+
+
+def _column_sizes(count):
+    return [(name, type_code, size * (count + 1 if name == 'text_offsets' else count))
+            for name, type_code, size in _COLUMNS]
+
+
+def _encode(output_list, state_list):
+    count = len(state_list)
+    cars = sorted({state.elevator for state in state_list if state.elevator is not None})
+    car_codes = {car: code for code, car in enumerate(cars)}
+    text_offsets = [0]
+    for output in output_list:
+        text_offsets.append(text_offsets[-1] + len(output))
+    columns = {
+        'time': [state.time for state in state_list],
+        'pid': [-1 if state.pid is None else state.pid for state in state_list],
+        'text_offsets': text_offsets,
+        'elevator': [-1 if state.elevator is None else car_codes[state.elevator] for state in state_list],
+        'state': [_STATE_CODES[state.state] for state in state_list],
+        'floor': [state.floor for state in state_list],
+    }
+    car_blob = '\n'.join(cars).encode()
+    text_blob = ''.join(output_list).encode('utf-8', 'surrogatepass')
+    chunks = [_HEADER.pack(_MAGIC, count, len(car_blob), len(text_blob))]
+    for name, type_code, size in _COLUMNS:
+        chunks.append(struct.pack('={count}{code}'.format(count=len(columns[name]), code=type_code), *columns[name]))
+    chunks.append(car_blob)
+    chunks.append(text_blob)
+    return b''.join(chunks)
+
+
+def _decode(buffer):
+    magic, count, car_size, text_size = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise ValueError('Unknown event file format')
+    view = memoryview(buffer)
+    columns = {}
+    offset = _HEADER.size
+    try:
+        for name, type_code, size in _column_sizes(count):
+            column = view[offset:offset + size].cast(type_code)
+            columns[name] = column.tolist()
+            column.release()
+            offset += size
+        cars = bytes(view[offset:offset + car_size]).decode().split('\n') if car_size else []
+        offset += car_size
+        text = bytes(view[offset:offset + text_size]).decode('utf-8', 'surrogatepass')
+    finally:
+        view.release()
+
+    text_offsets = columns['text_offsets']
+    output_list = [text[text_offsets[i]:text_offsets[i + 1]] for i in range(count)]
+    state_list = [
+        Event(time, _STATES[state], floor, None if pid < 0 else pid, index, None if car < 0 else cars[car])
+        for index, (time, state, floor, pid, car) in enumerate(zip(columns['time'], columns['state'],
+                                                                   columns['floor'], columns['pid'],
+                                                                   columns['elevator']))
+    ]
+    return output_list, state_list
+
+
+def load_events(key):
+    # (decrypted output list, parsed events in output order), or None if this output has not been stored
+    directory = events_directory()
+    if directory is None:
+        return None
+    try:
+        with open(_events_path(directory, key), 'rb') as events_file, \
+                mmap.mmap(events_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _decode(buffer)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def save_events(key, output_list, state_list):
+    directory = events_directory()
+    if directory is None or not state_list:
+        return
+    path = _events_path(directory, key)
+    temp_path = '{path}.{pid}.tmp'.format(path=path, pid=os.getpid())
+    try:
+        data = _encode(output_list, state_list)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, 'wb') as events_file:
+            events_file.write(data)
+        os.replace(temp_path, path)
+    except (OSError, struct.error):
+        # a pid or floor that does not fit its column, or an unwritable cache, only means no file is kept
+        return
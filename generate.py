@@ -0,0 +1,220 @@
+import argparse
+import json
+import random
+import sys
+from collections import deque
+
+from model import floor_index
+from parse import parse_input
+
+index_floor = {index: floor for floor, index in floor_index.items()}
+
+# times are kept in ticks of 0.0001 second, the resolution of the output, so they never drift
+ticks_per_second = 10000
+run_ticks = 4000
+serve_ticks = 4000
+
+
+def random_requests(count, seed=0):
+    rng = random.Random(seed)
+    floors = sorted(floor_index)
+    input_list = []
+    time = 0.0
+    for pid in range(1, count + 1):
+        time += rng.randrange(0, 20) / 10
+        start, end = rng.sample(floors, 2)
+        input_list.append('[{time:.1f}]{pid}-FROM-{start}-TO-{end}'.format(time=time, pid=pid, start=start, end=end))
+    return input_list
+
+
+def generate_output(input_list):
+    # the scheduler of check._simulate: the first unserved request is the main request, and requests waiting
+    # ahead in its direction inside its range are picked up on the way, stretching the trip to their targets
+    passenger_list = [parse_input(request) for request in input_list]
+    request_times, request_pids, request_starts, request_ends = [], [], [], []
+    pending = ({}, {})
+    for index, passenger in enumerate(passenger_list):
+        if passenger.floor not in floor_index or passenger.target not in floor_index:
+            raise ValueError('Request floor out of range: ' + input_list[index])
+        start, end = floor_index[passenger.floor], floor_index[passenger.target]
+        request_times.append(round(passenger.time * ticks_per_second))
+        request_pids.append(passenger.pid)
+        request_starts.append(start)
+        request_ends.append(end)
+        if start != end:
+            pending[end > start].setdefault(start, deque()).append(index)
+
+    output_list = []
+    append = output_list.append
+    served = bytearray(len(passenger_list))
+    first_unserved = 0
+    time = 0
+    position = floor_index[1]
+
+    def event(_time, text):
+        append('[{time:.4f}]{text}'.format(time=_time / ticks_per_second, text=text))
+
+    while True:
+        while first_unserved < len(served) and served[first_unserved]:
+            first_unserved += 1
+        if first_unserved == len(served):
+            break
+        main_request = first_unserved
+        start, end = request_starts[main_request], request_ends[main_request]
+        time = max(time, request_times[main_request])
+        step = 1 if start > position else -1
+        while position != start:
+            position += step
+            time += run_ticks
+            event(time, 'ARRIVE-{floor}'.format(floor=index_floor[position]))
+        floor = index_floor[start]
+
+        if start == end:
+            served[main_request] = 1
+            event(time, 'OPEN-{floor}'.format(floor=floor))
+            event(time, 'IN-{pid}-{floor}'.format(pid=request_pids[main_request], floor=floor))
+            event(time, 'OUT-{pid}-{floor}'.format(pid=request_pids[main_request], floor=floor))
+            time += serve_ticks
+            event(time, 'CLOSE-{floor}'.format(floor=floor))
+            continue
+
+        up = end > start
+        step = 1 if up else -1
+        low, high = min(start, end), max(start, end)
+        waiting = pending[up]
+        travel_end = end
+        leaving = {}
+        while True:
+            floor = index_floor[position]
+            queue = waiting.get(position) if low <= position <= high else None
+            if position in leaving or (queue and request_times[queue[0]] <= time) or position == start:
+                event(time, 'OPEN-{floor}'.format(floor=floor))
+                for pid in leaving.pop(position, ()):
+                    event(time, 'OUT-{pid}-{floor}'.format(pid=pid, floor=floor))
+                close_time = time + serve_ticks
+                # anyone showing up before the door closes gets in too
+                while queue and request_times[queue[0]] <= close_time:
+                    index = queue.popleft()
+                    served[index] = 1
+                    event(max(time, request_times[index]), 'IN-{pid}-{floor}'.format(pid=request_pids[index],
+                                                                                      floor=floor))
+                    leaving.setdefault(request_ends[index], []).append(request_pids[index])
+                    travel_end = max(travel_end, request_ends[index]) if up else min(travel_end, request_ends[index])
+                time = close_time
+                event(time, 'CLOSE-{floor}'.format(floor=floor))
+            if position == travel_end:
+                break
+            position += step
+            time += run_ticks
+            event(time, 'ARRIVE-{floor}'.format(floor=index_floor[position]))
+    return output_list
+
+
+def _payload(output):
+    return json.dumps({'content': output}, separators=(',', ':'))
+
+
+def format_output(output_list, encrypt=False):
+    # stdout lines as TimableOutput prints them: the time prefix, then the content or its encrypted payload
+    if encrypt:
+        from aes import encrypt as _encrypt
+        return [output[:output.index(']') + 1] + _encrypt(_payload(output)) for output in output_list]
+    return [output[:output.index(']') + 1] + output for output in output_list]
+
+
+def _event_time(output):
+    return float(output[1:output.index(']')])
+
+
+def _fault_drop(output_list, rng):
+    del output_list[rng.randrange(len(output_list))]
+
+
+def _fault_duplicate(output_list, rng):
+    index = rng.randrange(len(output_list))
+    output_list.insert(index, output_list[index])
+
+
+def _fault_early(output_list, rng):
+    # one line printed 0.2s before it may happen
+    index = rng.randrange(len(output_list))
+    output = output_list[index]
+    output_list[index] = '[{time:.4f}]{text}'.format(time=max(0.0, _event_time(output) - 0.2),
+                                                     text=output[output.index(']') + 1:])
+
+
+def _fault_floor(output_list, rng):
+    # one arrival skipping a floor
+    arrive_list = [index for index, output in enumerate(output_list) if ']ARRIVE-' in output]
+    if not arrive_list:
+        return _fault_drop(output_list, rng)
+    index = rng.choice(arrive_list)
+    head, floor = output_list[index].rsplit('-', 1)
+    position = floor_index[int(floor)]
+    position = position + 2 if position + 2 in index_floor else position - 2
+    output_list[index] = head + '-' + str(index_floor[position])
+
+
+def _fault_door(output_list, rng):
+    close_list = [index for index, output in enumerate(output_list) if ']CLOSE-' in output]
+    if not close_list:
+        return _fault_drop(output_list, rng)
+    del output_list[rng.choice(close_list)]
+
+
+faults = {
+    'drop': _fault_drop,
+    'duplicate': _fault_duplicate,
+    'early': _fault_early,
+    'floor': _fault_floor,
+    'door': _fault_door,
+}
+
+
+def inject_faults(output_list, kinds, count=1, seed=None):
+    rng = random.Random(seed)
+    output_list = list(output_list)
+    for i in range(count):
+        if output_list:
+            faults[rng.choice(kinds)](output_list, rng)
+    return output_list
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a valid elevator output for a request list.')
+    parser.add_argument('input_file', nargs='?', help='request list, one request per line')
+    parser.add_argument('-n', '--requests', type=int, default=None,
+                        help='generate this many random requests instead of reading input_file')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='seed of the random requests and faults')
+    parser.add_argument('-i', '--input_output', help='write the (random) request list here')
+    parser.add_argument('-o', '--output', help='output file, default is stdout')
+    parser.add_argument('-e', '--encrypt', action='store_true', help='encrypt every line as TimableOutput does')
+    parser.add_argument('-f', '--fault', action='append', choices=sorted(faults), default=[],
+                        help='kind of fault to inject, may be repeated')
+    parser.add_argument('--faults', type=int, default=1, help='number of faults to inject when -f is given')
+    args = parser.parse_args(argv)
+
+    if args.requests is not None:
+        input_list = random_requests(args.requests, args.seed or 0)
+    elif args.input_file:
+        with open(args.input_file) as input_file:
+            input_list = [line.strip() for line in input_file if line.strip()]
+    else:
+        parser.error('either input_file or -n is required')
+    if args.input_output:
+        with open(args.input_output, 'w') as input_file:
+            input_file.write('\n'.join(input_list) + '\n')
+
+    output_list = generate_output(input_list)
+    if args.fault:
+        output_list = inject_faults(output_list, args.fault, args.faults, args.seed)
+    output_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        output_file.writelines(line + '\n' for line in format_output(output_list, args.encrypt))
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,138 +1,373 @@
-import json
-import re
+import heapq
+from itertools import islice
+from operator import attrgetter
 
-from aes import decrypt
-from check import get_base_and_max_time
+from metrics import count, phase
 from model import Elevator
-from parse import parse_input, parse_output
+from parse import parse_input, parse_output, parse_output_list
 
 ACCEPTED = 'Accepted | Your answer is correct'
 WRONG_ANSWER = 'Wrong Answer | '
 TIME_LIMIT_EXCEEDED = 'Time Limit Exceeded | Your program exceeded max time limit.'
 
+# below this many events the cars are validated in this process, pickling them costs more than it saves
+parallel_event_threshold = 50000
+# from this many events on, the elevator rules are checked over whole columns by judge_numpy if numpy is there;
+# below it importing numpy costs more than it saves
+vectorized_event_threshold = 200000
+# the stream judge reads and decrypts the output this many lines at a time
+stream_batch_size = 4096
+
+
+_ENCRYPTION_ERROR = 'Encryption Error | Unexpected encryption error occurred. ' \
+                    'You might have printed some redundant outputs to stdout. ' \
+                    'Please make sure that all your outputs are printed by TimableOutput.'
+
+_aes = None
+
+
+def _load_aes():
+    # pycrypto is only loaded once some output really has to be decrypted
+    global _aes
+    if _aes is None:
+        import aes
+        _aes = aes
+    return _aes
+
+
+_judge_numpy = None
+
+
+def _load_judge_numpy():
+    global _judge_numpy
+    if _judge_numpy is None:
+        try:
+            import judge_numpy
+            _judge_numpy = judge_numpy
+        except ImportError:
+            _judge_numpy = False
+    return _judge_numpy or None
+
 
 def _decrypt_aes(cipher):
+    aes = _aes or _load_aes()
+    try:
+        return aes.decrypt_content(cipher)
+    except Exception:
+        raise ValueError(_ENCRYPTION_ERROR)
+
+
+def _decrypt_aes_list(cipher_list):
+    aes = _aes or _load_aes()
     try:
-        plain = decrypt(cipher)
-        plain_json = json.loads(plain)
-        return plain_json['content']
+        return aes.decrypt_contents(cipher_list)
     except Exception:
-        raise ValueError('Encryption Error | Unexpected encryption error occurred. '
-                         'You might have printed some redundant outputs to stdout. '
-                         'Please make sure that all your outputs are printed by TimableOutput.')
+        raise ValueError(_ENCRYPTION_ERROR)
+
+
+def _check_state_validity(state):
+    if not (-3 <= state.floor <= -1 or 1 <= state.floor <= 16):
+        raise ValueError(' '.join([
+            'Wrong State |',
+            'There is no floor',
+            str(state.floor)]))
 
 
 def _check_state_list_validity(state_list):
     for state in state_list:
-        if not (-3 <= state['floor'] <= -1 or 1 <= state['floor'] <= 16):
-            raise ValueError(' '.join([
-                'Wrong State |',
-                'There is no floor',
-                str(state['floor'])]))
+        _check_state_validity(state)
 
 
-def _initialize(input_list, output_list):
+def _initialize_passengers(input_list):
     passenger_list = [parse_input(request) for request in input_list]
-    state_list = [parse_output(state) for state in output_list]
     # passenger_list.sort(key=lambda e: e['time']) 暂时用不到，不过之后也许会用到
+    return {passenger.pid: passenger for passenger in passenger_list}
+
+
+def _initialize(input_list, output_list):
+    passenger_dict = _initialize_passengers(input_list)
+    state_list = parse_output_list(output_list)
     # state_list.sort(key=lambda e: e['time']) 输出数据确保时间单调不递减，暂时用不到
-    passenger_dict = {passenger.pid: passenger for passenger in passenger_list}
     _check_state_list_validity(state_list)
     return passenger_dict, state_list
 
 
-def _simulate_elevator_arrive(**kwargs):
-    elevator = kwargs['elevator']
-    state = kwargs['state']
-    time = state['time']
-    floor = state['floor']
-    elevator.arrive(floor, time)
+def _passenger_not_exist(pid, action):
+    return ValueError(' '.join([
+        'Wrong State |',
+        'Passenger',
+        str(pid),
+        'cannot ' + action + ' the elevator',
+        'because he/she does not exist'
+    ]))
 
 
-def _simulate_elevator_open(**kwargs):
-    elevator = kwargs['elevator']
-    state = kwargs['state']
-    time = state['time']
-    floor = state['floor']
-    elevator.open(floor, time)
+def bind_handlers(elevator, passenger_dict):
+    # one handler per event state, bound to this judgement's elevator and passengers once, taking the event only
+    arrive, open_door, close_door = elevator.arrive, elevator.open, elevator.close
+    enter_passenger, leave_passenger = elevator.enter_passenger, elevator.leave_passenger
+    get_passenger = passenger_dict.get
 
+    def _passenger_in(state):
+        passenger = get_passenger(state.pid)
+        if passenger is None:
+            raise _passenger_not_exist(state.pid, 'enter')
+        enter_passenger(passenger, state.floor, state.time)
 
-def _simulate_elevator_close(**kwargs):
-    elevator = kwargs['elevator']
-    state = kwargs['state']
-    time = state['time']
-    floor = state['floor']
-    elevator.close(floor, time)
+    def _passenger_out(state):
+        passenger = get_passenger(state.pid)
+        if passenger is None:
+            raise _passenger_not_exist(state.pid, 'leave')
+        leave_passenger(passenger, state.floor, state.time)
 
+    return {
+        'OPEN': lambda state: open_door(state.floor, state.time),
+        'CLOSE': lambda state: close_door(state.floor, state.time),
+        'IN': _passenger_in,
+        'OUT': _passenger_out,
+        'ARRIVE': lambda state: arrive(state.floor, state.time),
+    }
 
-def _simulate_passenger_in(**kwargs):
-    elevator = kwargs['elevator']
-    passenger_dict = kwargs['passenger_dict']
-    state = kwargs['state']
-    time = state['time']
-    pid = state['pid']
-    floor = state['floor']
-    if pid not in passenger_dict:
-        raise ValueError(' '.join([
-            'Wrong State |',
-            'Passenger',
-            str(pid),
-            'cannot enter the elevator',
-            'because he/she does not exist'
-        ]))
-    passenger = passenger_dict[pid]
-    elevator.enter_passenger(passenger, floor, time)
-
-
-def _simulate_passenger_out(**kwargs):
-    elevator = kwargs['elevator']
-    passenger_dict = kwargs['passenger_dict']
-    state = kwargs['state']
-    time = state['time']
-    pid = state['pid']
-    floor = state['floor']
-    if pid not in passenger_dict:
-        raise ValueError(' '.join([
-            'Wrong State |',
-            'Passenger',
-            str(pid),
-            'cannot leave the elevator',
-            'because he/she does not exist'
-        ]))
-    passenger = passenger_dict[pid]
-    elevator.leave_passenger(passenger, floor, time)
+
+def _bind_car_handlers(elevator):
+    # only what one car can check on its own, passengers are left to _judge_passengers
+    arrive, open_door, close_door = elevator.arrive, elevator.open, elevator.close
+    take_in, take_out = elevator.take_in, elevator.take_out
+    return {
+        'OPEN': lambda state: open_door(state.floor, state.time),
+        'CLOSE': lambda state: close_door(state.floor, state.time),
+        'IN': lambda state: take_in(state.pid, state.floor, state.time),
+        'OUT': lambda state: take_out(state.pid, state.floor, state.time),
+        'ARRIVE': lambda state: arrive(state.floor, state.time),
+    }
 
 
-def judge(input_list, output_list, check_max_time=False, need_decrypt=True):
-    base_time, max_time = get_base_and_max_time(input_list)
+def _judge_car(car_state_list):
+    # car_state_list holds (position in the merged stream, state) of one car, in time order
     elevator = Elevator()
+    handlers = _bind_car_handlers(elevator)
+    position = None
     try:
-        if need_decrypt:
-            output_list = list(map(_decrypt_aes, output_list))
-        passenger_dict, state_list = _initialize(input_list, output_list)
+        for position, state in car_state_list:
+            handlers[state.state](state)
     except ValueError as e:
-        return False, str(e), output_list, 0
-    state_list.sort(key=lambda elem: elem['time'])
-    output_list.sort(key=lambda elem: float(re.findall(r'\[\s*(\d+\.\d{4})\]', elem)[0]))
-    simulate_mapper = {
-        'OPEN': _simulate_elevator_open,
-        'CLOSE': _simulate_elevator_close,
-        'IN': _simulate_passenger_in,
-        'OUT': _simulate_passenger_out,
-        'ARRIVE': _simulate_elevator_arrive
-    }
-    for state in state_list:
+        return position, str(e), elevator.time, elevator.serving()
+    return None, None, elevator.time, elevator.serving()
+
+
+def _judge_passengers(state_list, passenger_dict):
+    # hand-offs between cars on the merged stream, returns (position, priority, message) of the first error.
+    # on a single event the passenger's existence is checked before the car and the car before the passenger
+    get_passenger = passenger_dict.get
+    for position, state in enumerate(state_list):
+        if state.pid is None:
+            continue
+        passenger = get_passenger(state.pid)
+        if state.state == 'IN':
+            if passenger is None:
+                return position, 0, str(_passenger_not_exist(state.pid, 'enter'))
+            move = passenger.enter_elevator
+        else:
+            if passenger is None:
+                return position, 0, str(_passenger_not_exist(state.pid, 'leave'))
+            move = passenger.leave_elevator
         try:
-            simulate_mapper[state['state']](
-                elevator=elevator,
-                state=state,
-                passenger_dict=passenger_dict,
-            )
+            move(state.floor)
         except ValueError as e:
-            return False, str(e), output_list, 0
-    if elevator.time > (max_time if check_max_time else 200.0):
+            return position, 2, str(e)
+    return None
+
+
+def _judge_cars(state_list, passenger_dict, workers=1):
+    car_state_lists = {}
+    for position, state in enumerate(state_list):
+        car_state_lists.setdefault(state.elevator, []).append((position, state))
+    car_state_lists = list(car_state_lists.values())
+    if workers > 1 and len(state_list) >= parallel_event_threshold:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(car_state_lists))) as executor:
+            car_results = list(executor.map(_judge_car, car_state_lists))
+    else:
+        car_results = list(map(_judge_car, car_state_lists))
+
+    errors = [(position, 1, message) for position, message, time, serving in car_results if position is not None]
+    passenger_error = _judge_passengers(state_list, passenger_dict)
+    if passenger_error:
+        errors.append(passenger_error)
+    time = max(time for position, message, time, serving in car_results)
+    serving = any(serving for position, message, time, serving in car_results)
+    if errors:
+        position, priority, message = min(errors)
+        return position, message, time, serving
+    return None, None, time, serving
+
+
+def _exceed_max_time(input_list, time, check_max_time, time_options, max_time=None):
+    if not check_max_time:
+        return time > 200.0
+    if max_time is not None:
+        return time > max_time
+    with phase('time_limit'):
+        # the Monte-Carlo estimator is only loaded when the time limit is checked at all
+        from check import get_base_and_max_time, get_max_time_bounds
+        lower_max_time, upper_max_time = get_max_time_bounds(input_list)
+        if time <= lower_max_time or time > upper_max_time:
+            count('time_limit_bound_decisions')
+            return time > upper_max_time
+        base_time, max_time = get_base_and_max_time(input_list, **(time_options or {}))
+        return time > max_time
+
+
+def _find_error_index(function, item_list):
+    # only called once the judgement has failed, to point the report at the offending line
+    for index, item in enumerate(item_list):
+        try:
+            function(item)
+        except ValueError:
+            return index
+    return None
+
+
+def _load_cached_events(output_list, need_decrypt, multi_elevator):
+    # the parsed events of an output judged before, see event_cache.py; (key, None) when it was not stored
+    from event_cache import events_key, load_events
+    with phase('event_cache'):
+        key = events_key(output_list, need_decrypt, multi_elevator)
+        events = load_events(key)
+    count('event_cache_hits' if events is not None else 'event_cache_misses')
+    return key, events
+
+
+def _judge_vectorized(judge_numpy, state_list, columns, passenger_dict):
+    # the elevator rules over whole columns at once, then the passengers on their own IN and OUT events.
+    # returns the final (time, serving) of the elevator, or None as soon as any event is wrong
+    index, time, serving = judge_numpy.first_violation(*columns)
+    if index is not None:
+        return None
+    passenger_state_list = [state_list[position] for position in judge_numpy.passenger_positions(columns)]
+    # with a single car, a passenger is in the car exactly when the passenger says so, so the car's own
+    # checks that are left fail only where the passenger's do
+    if _judge_passengers(passenger_state_list, passenger_dict) is not None:
+        return None
+    return time, serving
+
+
+def _judge_with_index(input_list, output_list, check_max_time, need_decrypt, time_options, max_time, workers,
+                      event_cache, multi_elevator):
+    events_key, state_list, columns = None, None, None
+    if event_cache:
+        events_key, events = _load_cached_events(output_list, need_decrypt, multi_elevator)
+        if events is not None:
+            output_list, state_list = events
+    if need_decrypt and state_list is None:
+        with phase('decrypt'):
+            count('lines_decrypted', len(output_list))
+            try:
+                output_list = _decrypt_aes_list(output_list)
+            except ValueError as e:
+                return False, str(e), output_list, 0, _find_error_index(_decrypt_aes, output_list)
+    with phase('parse'):
+        try:
+            passenger_dict = _initialize_passengers(input_list)
+        except ValueError as e:
+            return False, str(e), output_list, 0, None
+        if state_list is None:
+            try:
+                state_list = parse_output_list(output_list, multi_elevator)
+            except ValueError as e:
+                return False, str(e), output_list, 0, _find_error_index(
+                    lambda output: parse_output(output, multi_elevator=multi_elevator), output_list)
+            count('events_parsed', len(state_list))
+            if events_key is not None:
+                from event_cache import save_events
+                save_events(events_key, output_list, state_list)
+        # every line is parsed before any floor is checked, so a floor error is only reported on parsed output
+        try:
+            judge_numpy = _load_judge_numpy() if len(state_list) >= vectorized_event_threshold else None
+            if judge_numpy is None:
+                _check_state_list_validity(state_list)
+            else:
+                columns = judge_numpy.event_columns(state_list)
+                index = judge_numpy.first_invalid_floor(columns)
+                if index is not None:
+                    _check_state_validity(state_list[index])
+        except ValueError as e:
+            return False, str(e), output_list, 0, _find_error_index(_check_state_validity, state_list)
+        state_list.sort(key=attrgetter('time'))
+        if judge_numpy is not None:
+            columns = judge_numpy.sort_columns(columns)
+        output_list = [output_list[state.index] for state in state_list]
+    if len({state.elevator for state in state_list}) > 1:
+        # several cars, every car is validated on its own events
+        with phase('simulate'):
+            index, message, time, serving = _judge_cars(state_list, passenger_dict, workers)
+            count('events_simulated', len(state_list) if message is None else index + 1)
+        if message is not None:
+            return False, message, output_list, 0, index
+        return _judge_final_state(input_list, output_list, time, serving, passenger_dict,
+                                  check_max_time, time_options, max_time) + (None,)
+    final_state = None
+    if judge_numpy is not None:
+        with phase('simulate'):
+            final_state = _judge_vectorized(judge_numpy, state_list, columns, passenger_dict)
+        if final_state is None:
+            # something is wrong, the simulation below finds out what, on passengers nobody has moved yet
+            passenger_dict = _initialize_passengers(input_list)
+    if final_state is not None:
+        count('events_simulated', len(state_list))
+        time, serving = final_state
+        return _judge_final_state(input_list, output_list, time, serving, passenger_dict,
+                                  check_max_time, time_options, max_time) + (None,)
+    elevator = Elevator()
+    handlers = bind_handlers(elevator, passenger_dict)
+    index = 0
+    with phase('simulate'):
+        try:
+            for index, state in enumerate(state_list):
+                handlers[state.state](state)
+        except ValueError as e:
+            count('events_simulated', index + 1)
+            return False, str(e), output_list, 0, index
+        count('events_simulated', len(state_list))
+    return _judge_final_state(input_list, output_list, elevator.time, elevator.serving(), passenger_dict,
+                              check_max_time, time_options, max_time) + (None,)
+
+
+def judge_with_index(input_list, output_list, check_max_time=False, need_decrypt=True, time_options=None,
+                     max_time=None, workers=1, event_cache=False, verdict_memo=False, multi_elevator=False):
+    # same as judge(), plus the index in the returned output list of the line the verdict blames (None if no
+    # single line is to blame)
+    if not verdict_memo:
+        return _judge_with_index(input_list, output_list, check_max_time, need_decrypt, time_options, max_time,
+                                 workers, event_cache, multi_elevator)
+    # the whole verdict of an output judged before against the same input, see verdict_memo.py
+    from verdict_memo import load_verdict, save_verdict, verdict_key
+    key = verdict_key(input_list, output_list, {'check_max_time': bool(check_max_time),
+                                                'need_decrypt': bool(need_decrypt),
+                                                'time_options': time_options or {}, 'max_time': max_time,
+                                                'multi_elevator': bool(multi_elevator)})
+    verdict = load_verdict(key)
+    if verdict is not None:
+        count('verdict_memo_hits')
+        return verdict
+    count('verdict_memo_misses')
+    verdict = _judge_with_index(input_list, output_list, check_max_time, need_decrypt, time_options, max_time,
+                                workers, event_cache, multi_elevator)
+    save_verdict(key, verdict)
+    return verdict
+
+
+def judge(input_list, output_list, check_max_time=False, need_decrypt=True, time_options=None, max_time=None,
+          workers=1, event_cache=False, verdict_memo=False, multi_elevator=False):
+    return judge_with_index(input_list, output_list, check_max_time, need_decrypt, time_options, max_time,
+                            workers, event_cache, verdict_memo, multi_elevator)[:4]
+
+
+def _judge_final_state(input_list, output_list, time, serving, passenger_dict, check_max_time, time_options,
+                       max_time):
+    if _exceed_max_time(input_list, time, check_max_time, time_options, max_time):
         return False, TIME_LIMIT_EXCEEDED, output_list, 0
-    if elevator.serving():
+    if serving:
         return False, WRONG_ANSWER + 'Your elevator\'s door is not closed', output_list, 0
     for passenger in passenger_dict.values():
         if passenger.in_elevator:
@@ -140,7 +375,130 @@ def judge(input_list, output_list, check_max_time=False, need_decrypt=True):
         if passenger.floor != passenger.target:
             return False, WRONG_ANSWER + 'Passenger ' + \
                    str(passenger.pid) + ' has not arrived at his/her target floor yet', output_list, 0
-    return True, ACCEPTED, output_list, elevator.time
+    return True, ACCEPTED, output_list, time
+
+
+def _stream_batches(output_iter):
+    while True:
+        batch = list(islice(output_iter, stream_batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _count_stream(need_decrypt, output_list, parsed, simulated):
+    if need_decrypt:
+        count('lines_decrypted', len(output_list))
+    count('events_parsed', parsed)
+    count('events_simulated', simulated)
+
+
+def _judge_stream_with_index(input_list, output_iter, check_max_time, need_decrypt, time_options, max_time, window,
+                             multi_elevator):
+    # the output is read and decrypted a batch at a time, its lines are parsed, floor checked and simulated as
+    # they come. lines printed up to `window` lines late are put back in time order on the fly; if a line is older
+    # than an already simulated one, or names a car (several elevators), the whole output is judged by judge()
+    # instead. once something is wrong, only the checks judge() would put before it are still run on the rest:
+    # an undecryptable line beats everything, a line that cannot be parsed (or a wrong input) beats a floor that
+    # does not exist, which beats a failing simulation, unless a line still to come is older than the failing one
+    elevator = Elevator()
+    output_iter = iter(output_iter)
+    raw_output_list = []
+    output_list = []
+    sorted_output_list = []
+    pending = []
+    last_time = 0.0
+    parsed = 0
+    # (message, index) of the first error found so far, and what kind of error it is
+    error, error_kind = None, None
+    try:
+        passenger_dict = _initialize_passengers(input_list)
+        handlers = bind_handlers(elevator, passenger_dict)
+    except ValueError as e:
+        error, error_kind = (str(e), None), 'parse'
+    for batch in _stream_batches(output_iter):
+        begin = len(raw_output_list)
+        raw_output_list.extend(batch)
+        if need_decrypt:
+            try:
+                batch = _decrypt_aes_list(batch)
+            except ValueError as e:
+                _count_stream(need_decrypt, output_list, parsed, len(sorted_output_list))
+                index = _find_error_index(_decrypt_aes, batch)
+                return False, str(e), raw_output_list, 0, None if index is None else begin + index
+        output_list.extend(batch)
+        if error_kind == 'parse':
+            # only an undecryptable line can still come before it, without encryption the verdict is decided
+            if not need_decrypt:
+                break
+            continue
+        for index, output in enumerate(batch, begin):
+            try:
+                state = parse_output(output, index, multi_elevator)
+            except ValueError as e:
+                error, error_kind = (str(e), index), 'parse'
+                break
+            parsed += 1
+            if error_kind == 'floor':
+                continue
+            try:
+                _check_state_validity(state)
+            except ValueError as e:
+                error, error_kind = (str(e), index), 'floor'
+                continue
+            if state.time < last_time or state.elevator is not None:
+                break
+            heapq.heappush(pending, (state.time, state.index, state))
+            while error_kind is None and len(pending) > window:
+                last_time, ready_index, ready_state = heapq.heappop(pending)
+                sorted_output_list.append(output_list[ready_index])
+                try:
+                    handlers[ready_state.state](ready_state)
+                except ValueError as e:
+                    # every line simulated so far keeps its place in judge()'s time order, which only a line
+                    # older than this one can change
+                    error, error_kind = (str(e), len(sorted_output_list) - 1), 'simulate'
+        else:
+            continue
+        if error_kind == 'parse':
+            if not need_decrypt:
+                break
+            continue
+        count('stream_fallbacks')
+        raw_output_list.extend(output_iter)
+        return judge_with_index(input_list, raw_output_list, check_max_time, need_decrypt, time_options, max_time,
+                                multi_elevator=multi_elevator)
+    if error_kind is None:
+        while pending:
+            last_time, ready_index, ready_state = heapq.heappop(pending)
+            sorted_output_list.append(output_list[ready_index])
+            try:
+                handlers[ready_state.state](ready_state)
+            except ValueError as e:
+                error, error_kind = (str(e), len(sorted_output_list) - 1), 'simulate'
+                break
+    _count_stream(need_decrypt, output_list, parsed, len(sorted_output_list))
+    if error_kind == 'simulate':
+        # the lines after the failing one are still listed in time order
+        sorted_output_list.extend(output_list[ready_index] for ready_time, ready_index, ready_state in sorted(pending))
+        return False, error[0], sorted_output_list, 0, error[1]
+    if error_kind is not None:
+        return False, error[0], output_list, 0, error[1]
+    return _judge_final_state(input_list, sorted_output_list, elevator.time, elevator.serving(),
+                              passenger_dict, check_max_time, time_options, max_time) + (None,)
+
+
+def judge_stream_with_index(input_list, output_iter, check_max_time=False, need_decrypt=True, time_options=None,
+                            max_time=None, window=64, multi_elevator=False):
+    with phase('stream'):
+        return _judge_stream_with_index(input_list, output_iter, check_max_time, need_decrypt, time_options,
+                                        max_time, window, multi_elevator)
+
+
+def judge_stream(input_list, output_iter, check_max_time=False, need_decrypt=True, time_options=None,
+                 max_time=None, window=64, multi_elevator=False):
+    return judge_stream_with_index(input_list, output_iter, check_max_time, need_decrypt, time_options,
+                                   max_time, window, multi_elevator)[:4]
 
 
 def open_file(input_file, output_file):
@@ -0,0 +1,80 @@
+from operator import attrgetter
+
+import numpy as np
+
+from model import Elevator, floor_index
+
+_STATE_CODES = {'OPEN': 0, 'CLOSE': 1, 'ARRIVE': 2, 'IN': 3, 'OUT': 4}
+_OPEN, _CLOSE, _ARRIVE, _IN, _OUT = range(5)
+_FLOOR_INDEX = np.zeros(max(floor_index) - min(floor_index) + 1, dtype=np.int64)
+for _floor, _index in floor_index.items():
+    _FLOOR_INDEX[_floor - min(floor_index)] = _index
+
+
+def event_columns(state_list):
+    # time, state code and floor of every event, in the order of state_list
+    count = len(state_list)
+    time = np.fromiter(map(attrgetter('time'), state_list), np.float64, count)
+    state = np.fromiter(map(_STATE_CODES.__getitem__, map(attrgetter('state'), state_list)), np.int8, count)
+    floor = np.fromiter(map(attrgetter('floor'), state_list), np.int64, count)
+    return time, state, floor
+
+
+def _first(mask):
+    return int(np.argmax(mask)) if mask.any() else None
+
+
+def first_invalid_floor(columns):
+    time, state, floor = columns
+    return _first(~np.isin(floor, list(floor_index)))
+
+
+def sort_columns(columns):
+    # in time order, events at the same time keep their order as list.sort does
+    order = np.argsort(columns[0], kind='stable')
+    return tuple(column[order] for column in columns)
+
+
+def passenger_positions(columns):
+    time, state, floor = columns
+    return np.flatnonzero((state == _IN) | (state == _OUT)).tolist()
+
+
+def _previous(mask, position):
+    # position of the last event before each event that matches mask, -1 if there is none
+    last = np.maximum.accumulate(np.where(mask, position, -1))
+    return np.concatenate(([-1], last[:-1]))
+
+
+def first_violation(time, state, floor):
+    # index of the first event the elevator of model.Elevator rejects when every event before it was accepted:
+    # the arrival, door and serve checks, and the door checks of IN and OUT; passengers are not looked at.
+    # returns (index or None, time, serving), the last two as the elevator ends up if no event is wrong
+    position = np.arange(time.shape[0])
+    floor = _FLOOR_INDEX[floor - min(floor_index)]
+    arrive = state == _ARRIVE
+    open_door = state == _OPEN
+    close_door = state == _CLOSE
+    door = open_door | close_door
+
+    last_arrive = _previous(arrive, position)
+    last_open = _previous(open_door, position)
+    last_door = _previous(door, position)
+    # an elevator that has not moved yet stands at floor 1 since time 0 with the door closed
+    arrive_floor = np.where(last_arrive >= 0, floor[last_arrive], floor_index[1])
+    arrive_time = np.where(last_arrive >= 0, time[last_arrive], 0.0)
+    open_floor = np.where(last_open >= 0, floor[last_open], floor_index[1])
+    door_time = np.where(last_door >= 0, time[last_door], 0.0)
+    serving = (last_door >= 0) & open_door[last_door]
+
+    eps = Elevator.eps
+    wrong = arrive & ((np.abs(floor - arrive_floor) != 1) | (time - arrive_time + eps < Elevator.run_timespan))
+    wrong |= open_door & (serving | (floor != arrive_floor) |
+                          (time - door_time + eps < np.abs(floor - open_floor) * Elevator.run_timespan))
+    wrong |= close_door & ((floor != open_floor) | ~serving | (time - door_time + eps < Elevator.serve_timespan))
+    wrong |= ((state == _IN) | (state == _OUT)) & (~serving | (floor != open_floor))
+
+    doors = np.flatnonzero(door)
+    final_time = float(time[doors[-1]]) if doors.shape[0] else 0.0
+    final_serving = bool(doors.shape[0] and open_door[doors[-1]])
+    return _first(wrong), final_time, final_serving
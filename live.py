@@ -0,0 +1,189 @@
+import argparse
+import heapq
+import json
+import sys
+
+from judge import TIME_LIMIT_EXCEEDED, _check_state_validity, _decrypt_aes, _initialize_passengers, \
+    _judge_final_state, bind_handlers, judge_with_index
+from metrics import count
+from model import Elevator
+from parse import parse_output
+from spj import PRETIME_PATTERN, _time_options, _to_bool
+
+
+class LiveJudge:
+    # judges the output of a running program line by line. feed() and advance() return None while the verdict
+    # is still open and the verdict (as judge_stream_with_index returns it) once it is decided, so that the
+    # harness can stop the program at the first definite violation instead of waiting for it to exit
+    def __init__(self, input_list, check_max_time=False, need_decrypt=True, time_options=None, max_time=None,
+                 window=64, multi_elevator=False):
+        self.__input_list = list(input_list)
+        self.__check_max_time = check_max_time
+        self.__need_decrypt = need_decrypt
+        self.__time_options = time_options
+        self.__max_time = max_time if check_max_time else 200.0
+        self.__max_time_bounds = None
+        self.__window = window
+        self.__multi_elevator = multi_elevator
+        self.__raw_output_list = []
+        self.__output_list = []
+        self.__pending = []
+        self.__last_time = 0.0
+        self.__empty_count = 0
+        self.__cars = {}
+        self.__buffered = False
+        self.__verdict = None
+        try:
+            self.__passenger_dict = _initialize_passengers(self.__input_list)
+        except ValueError as e:
+            self.__verdict = False, str(e), self.__output_list, 0, None
+
+    @property
+    def verdict(self):
+        return self.__verdict
+
+    @property
+    def output_list(self):
+        return self.__output_list
+
+    def __fail(self, message, index):
+        self.__verdict = False, message, self.__output_list, 0, index
+
+    def __exceeds_max_time(self, time):
+        # the Monte-Carlo estimate is only computed once a line falls between the analytic bounds
+        if self.__max_time is None:
+            if self.__max_time_bounds is None:
+                from check import get_max_time_bounds
+                self.__max_time_bounds = get_max_time_bounds(self.__input_list)
+            lower_max_time, upper_max_time = self.__max_time_bounds
+            if time <= lower_max_time or time > upper_max_time:
+                return time > upper_max_time
+            from check import get_base_and_max_time
+            base_time, self.__max_time = get_base_and_max_time(self.__input_list, **(self.__time_options or {}))
+        return time > self.__max_time
+
+    def __handlers(self, car):
+        # every car (None for a single elevator) is simulated on its own, passengers are shared between cars
+        handlers = self.__cars.get(car)
+        if handlers is None:
+            elevator = Elevator()
+            handlers = self.__cars[car] = elevator, bind_handlers(elevator, self.__passenger_dict)
+        return handlers[1]
+
+    def __simulate(self):
+        last_time, index, state = heapq.heappop(self.__pending)
+        try:
+            self.__handlers(state.elevator)[state.state](state)
+        except ValueError as e:
+            self.__fail(str(e), index)
+        self.__last_time = last_time
+
+    def __feed(self, output):
+        index = len(self.__raw_output_list)
+        self.__raw_output_list.append(output)
+        try:
+            if self.__need_decrypt:
+                output = _decrypt_aes(output)
+            self.__output_list.append(output)
+            state = parse_output(output, index, self.__multi_elevator)
+            _check_state_validity(state)
+        except ValueError as e:
+            return self.__fail(str(e), index)
+        # judge() holds the time of the last door event against the limit, no line can make up for a late one
+        if state.state in ('OPEN', 'CLOSE') and self.__exceeds_max_time(state.time):
+            return self.__fail(TIME_LIMIT_EXCEEDED, index)
+        if self.__buffered:
+            return
+        if state.time < self.__last_time:
+            # printed too late to be put back in order, the rest is only checked line by line and the whole
+            # output is judged by judge() at the end
+            count('stream_fallbacks')
+            self.__buffered = True
+            return
+        heapq.heappush(self.__pending, (state.time, index, state))
+        while len(self.__pending) > self.__window and self.__verdict is None:
+            self.__simulate()
+
+    def feed(self, output):
+        # empty lines are only held back until a non-empty line shows they are not trailing
+        if self.__verdict is None:
+            if not output:
+                self.__empty_count += 1
+                return None
+            while self.__empty_count and self.__verdict is None:
+                self.__empty_count -= 1
+                self.__feed('')
+            if self.__verdict is None:
+                self.__feed(output)
+        return self.__verdict
+
+    def advance(self, now):
+        # `now` is the program's clock, the one its lines are stamped with. once it has passed the time limit
+        # every line still to come is too late, so the lines received so far decide the verdict: a wrong line
+        # stays wrong, but output that is only unfinished ran out of time
+        if self.__verdict is None and self.__exceeds_max_time(now):
+            correct, message, output_list, score, index = self.finish()
+            if not correct and index is None:
+                self.__verdict = False, TIME_LIMIT_EXCEEDED, output_list, 0, None
+        return self.__verdict
+
+    def finish(self):
+        if self.__verdict is not None:
+            return self.__verdict
+        if self.__buffered:
+            self.__verdict = judge_with_index(self.__input_list, self.__output_list, self.__check_max_time, False,
+                                              self.__time_options, self.__max_time,
+                                              multi_elevator=self.__multi_elevator)
+            return self.__verdict
+        while self.__pending and self.__verdict is None:
+            self.__simulate()
+        if self.__verdict is None:
+            elevators = [elevator for elevator, handlers in self.__cars.values()]
+            time = max((elevator.time for elevator in elevators), default=0.0)
+            serving = any(elevator.serving() for elevator in elevators)
+            self.__verdict = _judge_final_state(self.__input_list, self.__output_list, time, serving,
+                                                self.__passenger_dict, self.__check_max_time,
+                                                self.__time_options, self.__max_time) + (None,)
+        return self.__verdict
+
+
+def _remove_pretime(output):
+    # unlike spj, a line without a time stamp is passed on and fails to parse instead of crashing the judge
+    match = PRETIME_PATTERN.match(output)
+    return match.group(1) if match else output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Judge the output of a running program as it is printed, '
+                                                 'e.g. "program | python live.py -I stdin.txt". Exits as soon as '
+                                                 'the output is known to be wrong.')
+    parser.add_argument('-I', '--input_file', required=True, help='Input file of special judge.')
+    parser.add_argument('-V', '--value', action='append', default=[],
+                        help='Attached values for special judge, as for spj.py.')
+    args = parser.parse_args(argv)
+
+    values = dict(value.split('=', 1) if '=' in value else (value, '') for value in args.value)
+    check_max_time = _to_bool(values.pop('check_max_time', None))
+    need_decrypt = _to_bool(values.pop('need_decrypt', None))
+    window = int(values.pop('window', 64))
+    multi_elevator = _to_bool(values.pop('multi_elevator', None))
+    with open(args.input_file) as input_file:
+        input_list = [line.strip() for line in input_file]
+    while input_list and not input_list[-1]:
+        input_list.pop()
+
+    live = LiveJudge(input_list, check_max_time, need_decrypt, _time_options(**values), window=window,
+                     multi_elevator=multi_elevator)
+    verdict = live.verdict
+    for line in sys.stdin:
+        line = line.strip()
+        if verdict is not None or live.feed(_remove_pretime(line) if line else line) is not None:
+            break
+    correct, message, output_list, score, index = live.finish()
+    print(json.dumps({'correct': correct, 'message': message, 'score': score, 'index': index,
+                      'lines': len(output_list)}, sort_keys=True))
+    return 0 if correct else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
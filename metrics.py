@@ -0,0 +1,118 @@
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter, process_time
+
+METRICS_ENV = 'ELEVATOR_SPJ_METRICS'
+METRICS_FILE_ENV = 'ELEVATOR_SPJ_METRICS_FILE'
+PROMETHEUS_PREFIX = 'elevator_spj'
+
+# per thread (the judge server answers requests in threads): the record being collected, None while
+# instrumentation is off so that phase() and count() do nothing, and the last record collected
+_state = threading.local()
+
+
+class _DisabledPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_disabled_phase = _DisabledPhase()
+
+
+def enabled(option=None):
+    value = os.environ.get(METRICS_ENV, '') if option is None else option
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return not not value
+
+
+class _Phase:
+    __slots__ = ('record', 'name', 'wall', 'cpu')
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.wall = perf_counter()
+        self.cpu = process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        times = self.record['phases'].setdefault(self.name, {'wall': 0.0, 'cpu': 0.0, 'count': 0})
+        times['wall'] += perf_counter() - self.wall
+        times['cpu'] += process_time() - self.cpu
+        times['count'] += 1
+        return False
+
+
+def phase(name):
+    record = getattr(_state, 'record', None)
+    if record is None:
+        return _disabled_phase
+    return _Phase(record, name)
+
+
+def count(name, value=1):
+    record = getattr(_state, 'record', None)
+    if record is not None:
+        record['counters'][name] = record['counters'].get(name, 0) + value
+
+
+@contextmanager
+def collect():
+    previous = getattr(_state, 'record', None)
+    record = _state.record = {'phases': {}, 'counters': {}}
+    try:
+        yield record
+    finally:
+        _state.record = previous
+        _state.last_record = record
+
+
+def last_record():
+    return getattr(_state, 'last_record', None)
+
+
+def _prometheus_lines(record):
+    lines = []
+    for field, help_text in (('wall', 'wall clock seconds'), ('cpu', 'process cpu seconds')):
+        name = '{prefix}_phase_{field}_seconds'.format(prefix=PROMETHEUS_PREFIX, field=field)
+        lines.append('# HELP {name} Judge phase {help}.'.format(name=name, help=help_text))
+        lines.append('# TYPE {name} gauge'.format(name=name))
+        for phase_name, times in sorted(record['phases'].items()):
+            lines.append('{name}{{phase="{phase}"}} {value:.6f}'.format(name=name, phase=phase_name,
+                                                                       value=times[field]))
+    for counter_name, value in sorted(record['counters'].items()):
+        name = '{prefix}_{counter}'.format(prefix=PROMETHEUS_PREFIX, counter=counter_name)
+        lines.append('# TYPE {name} gauge'.format(name=name))
+        lines.append('{name} {value}'.format(name=name, value=value))
+    if 'correct' in record:
+        name = PROMETHEUS_PREFIX + '_correct'
+        lines.append('# TYPE {name} gauge'.format(name=name))
+        lines.append('{name} {value}'.format(name=name, value=int(record['correct'])))
+    return lines
+
+
+def write(record, path=None):
+    # a .prom path is rewritten as a Prometheus textfile of the last judgement, any other path gets one JSON
+    # line per judgement appended
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return
+    import json
+    if path.endswith('.prom'):
+        # the textfile collector may read at any moment, so the file is replaced at once
+        temp_path = '{path}.{pid}.tmp'.format(path=path, pid=os.getpid())
+        with open(temp_path, 'w') as metrics_file:
+            metrics_file.write('\n'.join(_prometheus_lines(record)) + '\n')
+        os.replace(temp_path, path)
+    else:
+        with open(path, 'a') as metrics_file:
+            metrics_file.write(json.dumps(record, sort_keys=True) + '\n')
@@ -1,7 +1,12 @@
 from enum import Enum, unique
 
+# floor number to its position in the building, there is no floor 0 between -1 and 1
+floor_index = {floor: floor + 1 if floor < 0 else floor for floor in range(-3, 17) if floor}
+
 
 class Passenger:
+    __slots__ = ('__pid', '__floor', '__target', '__time', '__in_elevator')
+
     def __init__(self, pid, start, target, time):
         self.__pid = pid
         self.__floor = start
@@ -63,6 +68,8 @@ class Passenger:
 
 
 class Elevator:
+    __slots__ = ('__floor', '__time', '__last_arrive_floor', '__last_arrive_time', '__state', '__passengers')
+
     run_timespan = 0.4
     serve_timespan = 0.4
     eps = 1e-8
@@ -79,7 +86,7 @@ class Elevator:
         self.__last_arrive_floor = 1
         self.__last_arrive_time = 0.0
         self.__state = Elevator.State.STOPPED
-        self.__passengers = {}
+        self.__passengers = set()
 
     @property
     def floor(self):
@@ -94,13 +101,7 @@ class Elevator:
         return self.__state
 
     def arrive(self, floor, time):
-        before_floor = self.__last_arrive_floor
-        after_floor = floor
-        if before_floor < 0:
-            before_floor += 1
-        if after_floor < 0:
-            after_floor += 1
-        if abs(after_floor - before_floor) != 1:
+        if abs(floor_index[floor] - floor_index[self.__last_arrive_floor]) != 1:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Elevator cannot arrive',
@@ -121,20 +122,20 @@ class Elevator:
         self.__last_arrive_floor = floor
         self.__last_arrive_time = time
 
-    def enter_passenger(self, passenger, floor, time):
-        if passenger.pid in self.__passengers:
+    def take_in(self, pid, floor, time):
+        if pid in self.__passengers:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'already in the elevator',
                 'so he/she cannot get in'
             ]))
-        if self.__state != Elevator.State.SERVING:
+        if self.__state is not Elevator.State.SERVING:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'cannot enter the elevator',
                 'when the elevator is not serving'
             ]))
@@ -142,27 +143,26 @@ class Elevator:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'cannot enter the elevator',
                 'at a different floor floor'
             ]))
-        passenger.enter_elevator(floor)
-        self.__passengers[passenger.pid] = passenger
+        self.__passengers.add(pid)
 
-    def leave_passenger(self, passenger, floor, time):
-        if passenger.pid not in self.__passengers:
+    def take_out(self, pid, floor, time):
+        if pid not in self.__passengers:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'not in the elevator',
                 'so he/she cannot get out'
             ]))
-        if self.__state != Elevator.State.SERVING:
+        if self.__state is not Elevator.State.SERVING:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'cannot leave the elevator',
                 'when the elevator is not serving'
             ]))
@@ -170,21 +170,23 @@ class Elevator:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Passenger',
-                str(passenger.pid),
+                str(pid),
                 'cannot leave the elevator',
                 'at a different floor floor'
             ]))
+        self.__passengers.remove(pid)
+
+    def enter_passenger(self, passenger, floor, time):
+        self.take_in(passenger.pid, floor, time)
+        passenger.enter_elevator(floor)
+
+    def leave_passenger(self, passenger, floor, time):
+        self.take_out(passenger.pid, floor, time)
         passenger.leave_elevator(floor)
-        del self.__passengers[passenger.pid]
 
     def judge_run_speed(self, floor, time):
-        before_floor = self.__floor
-        after_floor = floor
-        if before_floor < 0:
-            before_floor += 1
-        if after_floor < 0:
-            after_floor += 1
-        if time - self.__time + Elevator.eps < abs(after_floor - before_floor) * Elevator.run_timespan:
+        if time - self.__time + Elevator.eps < abs(floor_index[floor] - floor_index[self.__floor]) * \
+                Elevator.run_timespan:
             raise ValueError(' '.join([
                 'Time Error |',
                 'Elevator runs from floor',
@@ -205,7 +207,7 @@ class Elevator:
         return True
 
     def open(self, floor, time):
-        if self.__state == Elevator.State.SERVING:
+        if self.__state is Elevator.State.SERVING:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Elevator cannot open twice at floor',
@@ -229,7 +231,7 @@ class Elevator:
                 'Wrong State |',
                 'Elevator cannot open and close at different floors'
             ]))
-        if self.__state != Elevator.State.SERVING:
+        if self.__state is not Elevator.State.SERVING:
             raise ValueError(' '.join([
                 'Wrong State |',
                 'Elevator cannot close twice at floor',
@@ -240,4 +242,4 @@ class Elevator:
             self.__time = time
 
     def serving(self):
-        return self.__state == Elevator.State.SERVING
+        return self.__state is Elevator.State.SERVING
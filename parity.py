@@ -0,0 +1,133 @@
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import random
+import sys
+
+import check
+import judge
+from generate import faults, generate_output, inject_faults
+
+PARITY_DIR = os.path.dirname(os.path.abspath(__file__))
+PARITY_BASELINE = os.path.join(PARITY_DIR, 'benchmarks', 'parity.json')
+PARITY_INPUTS = os.path.join(PARITY_DIR, 'data', 'public', '*', '*', 'stdin.txt')
+
+# every input is simulated once per seed, the seed also picks the fastest or slowest run and serve timespans
+SIMULATE_SEEDS = range(4)
+NUMPY_TRIALS = 64
+# every input is judged with its generated output, then with one or two seeded faults per seed
+FAULT_SEEDS = range(12)
+TOLERANCE = 1e-6
+
+
+def _load_inputs():
+    inputs = []
+    for path in sorted(glob.glob(PARITY_INPUTS)):
+        with open(path) as input_file:
+            input_list = [line.strip() for line in input_file if line.strip()]
+        inputs.append((os.path.relpath(path, PARITY_DIR).replace(os.sep, '/'), input_list))
+    return inputs
+
+
+def _simulate_times(input_list):
+    # check._simulate draws the request disturbances from `random` itself unless they are given, as it always did
+    times = []
+    for seed in SIMULATE_SEEDS:
+        random.seed(seed)
+        run_timespan = check.base_run_timespan + check.run_timespan_disturb * (seed & 1)
+        serve_timespan = check.base_serve_timespan + check.serve_timespan_disturb * (seed >> 1 & 1)
+        times.append(check._simulate(check._parse_request_list(input_list), run_timespan, serve_timespan))
+    return times
+
+
+def _engine_difference(input_list):
+    # the numpy engine against the python one on the same drawn trials
+    request_list = check._parse_request_list(input_list)
+    samples = check._draw_samples(request_list, NUMPY_TRIALS, random.Random(0))
+    python_times = check._simulate_trials(request_list, *samples)
+    numpy_times = check._simulate_trials_numpy(request_list, *samples)
+    return max(abs(python_time - float(numpy_time)) for python_time, numpy_time in zip(python_times, numpy_times))
+
+
+def _judge_cases(input_list):
+    output_list = generate_output(input_list)
+    yield output_list
+    for seed in FAULT_SEEDS:
+        yield inject_faults(output_list, sorted(faults), 1 + seed % 2, seed)
+
+
+def _judge_verdicts(input_list):
+    verdicts = []
+    for output_list in _judge_cases(input_list):
+        correct, message, output_list, score = judge.judge(input_list, output_list, need_decrypt=False)
+        verdicts.append([correct, message, score])
+    return verdicts
+
+
+def _same_times(expected, actual):
+    return len(expected) == len(actual) and all(abs(a - b) <= TOLERANCE for a, b in zip(expected, actual))
+
+
+def _same_verdicts(expected, actual):
+    return len(expected) == len(actual) and all(
+        expected_verdict[:2] == actual_verdict[:2] and abs(expected_verdict[2] - actual_verdict[2]) <= TOLERANCE
+        for expected_verdict, actual_verdict in zip(expected, actual))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hold the rewritten time estimate and judge against the results '
+                                                 'recorded from the reference implementation on the public inputs.')
+    parser.add_argument('--save', action='store_true', help='record the results of the current code as baseline')
+    args = parser.parse_args(argv)
+
+    inputs = _load_inputs()
+    results = {'simulate': {name: _simulate_times(input_list) for name, input_list in inputs},
+               'judge': {name: _judge_verdicts(input_list) for name, input_list in inputs}}
+    if args.save:
+        with open(PARITY_BASELINE, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=1, sort_keys=True)
+            baseline_file.write('\n')
+        return 0
+
+    with open(PARITY_BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+    failures = []
+    for name, times in sorted(results['simulate'].items()):
+        if not _same_times(baseline['simulate'].get(name, []), times):
+            failures.append('simulate {name}: expected {expected}, got {actual}'.format(
+                name=name, expected=baseline['simulate'].get(name), actual=times))
+    for name, verdicts in sorted(results['judge'].items()):
+        if not _same_verdicts(baseline['judge'].get(name, []), verdicts):
+            failures.append('judge {name}: expected {expected}, got {actual}'.format(
+                name=name, expected=baseline['judge'].get(name), actual=verdicts))
+
+    if importlib.util.find_spec('numpy') is None:
+        print('numpy is not installed, the numpy engine and judge are not checked')
+    else:
+        for name, input_list in inputs:
+            difference = _engine_difference(input_list)
+            if difference > TOLERANCE:
+                failures.append('numpy engine {name}: differs from the python engine by {difference}'.format(
+                    name=name, difference=difference))
+        # the same outputs once more, every one checked over whole event columns first
+        threshold = judge.vectorized_event_threshold
+        judge.vectorized_event_threshold = 1
+        try:
+            for name, input_list in inputs:
+                verdicts = _judge_verdicts(input_list)
+                if not _same_verdicts(baseline['judge'].get(name, []), verdicts):
+                    failures.append('numpy judge {name}: expected {expected}, got {actual}'.format(
+                        name=name, expected=baseline['judge'].get(name), actual=verdicts))
+        finally:
+            judge.vectorized_event_threshold = threshold
+
+    for failure in failures:
+        print(failure)
+    print('{count} inputs, {failures} parity failures'.format(count=len(inputs), failures=len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,14 @@
 import re
+from collections import namedtuple
 
 from model import Passenger
 
 
+_INPUT_PATTERN = re.compile(r'\[\s*(\d+\.\d+)\](\d+)-FROM-(-?[1-9]\d*)-TO-(-?[1-9]\d*)')
+
+
 def parse_input(request):
-    pattern = re.compile(r'\[\s*(\d+\.\d+)\](\d+)-FROM-(-?[1-9]\d*)-TO-(-?[1-9]\d*)')
-    matcher = re.match(pattern, request)
+    matcher = _INPUT_PATTERN.match(request)
     if not matcher:
         raise ValueError('Input Format Error | Invalid Input: ' + request)
     time = float(matcher.group(1))
@@ -15,68 +18,53 @@ def parse_input(request):
     return Passenger(pid, start, end, time)
 
 
-def parse_output(state):
-    time_pattern = r'\[\s*(\d+\.\d{4})\]'
-
-    def parse_elevator_open(_state):
-        pattern = re.compile(time_pattern + r'OPEN-(-?[1-9]\d*)')
-        matcher = re.match(pattern, _state)
-        if not matcher:
-            raise ValueError('Output Format Error | Invalid Elevator OPEN State: ' + _state)
-        time = float(matcher.group(1))
-        floor = int(matcher.group(2))
-        return {'time': time, 'state': 'OPEN', 'floor': floor}
-
-    def parse_elevator_close(_state):
-        pattern = re.compile(time_pattern + r'CLOSE-(-?[1-9]\d*)')
-        matcher = re.match(pattern, _state)
-        if not matcher:
-            raise ValueError('Output Format Error | Invalid Elevator CLOSE State: ' + _state)
-        time = float(matcher.group(1))
-        floor = int(matcher.group(2))
-        return {'time': time, 'state': 'CLOSE', 'floor': floor}
-
-    def parse_passenger_in(_state):
-        pattern = re.compile(time_pattern + r'IN-(\d+)-(-?[1-9]\d*)')
-        matcher = re.match(pattern, _state)
-        if not matcher:
-            raise ValueError('Output Format Error | Invalid Passenger IN State: ' + _state)
-        time = float(matcher.group(1))
-        pid = int(matcher.group(2))
-        floor = int(matcher.group(3))
-        return {'time': time, 'state': 'IN', 'pid': pid, 'floor': floor}
-
-    def parse_passenger_out(_state):
-        pattern = re.compile(time_pattern + r'OUT-(\d+)-(-?[1-9]\d*)')
-        matcher = re.match(pattern, _state)
-        if not matcher:
-            raise ValueError('Output Format Error | Invalid Passenger OUT State: ' + _state)
-        time = float(matcher.group(1))
-        pid = int(matcher.group(2))
-        floor = int(matcher.group(3))
-        return {'time': time, 'state': 'OUT', 'pid': pid, 'floor': floor}
-
-    def parse_arrive(_state):
-        pattern = re.compile(time_pattern + r'ARRIVE-(-?[1-9]\d*)')
-        matcher = re.match(pattern, _state)
-        if not matcher:
-            raise ValueError('Output Format Error | Invalid Arrive State: ' + _state)
-        time = float(matcher.group(1))
-        floor = int(matcher.group(2))
-        return {'time': time, 'state': 'ARRIVE', 'floor': floor}
-
-    parse_mapper = {
-        'OPEN': parse_elevator_open,
-        'CLOSE': parse_elevator_close,
-        'IN': parse_passenger_in,
-        'OUT': parse_passenger_out,
-        'ARRIVE': parse_arrive
-    }
-
-    state_keywords = re.findall(r'[A-Z]+', state)
-    if not state_keywords or state_keywords[0] not in parse_mapper:
+# elevator is the car id after the last dash with multi_elevator, otherwise None
+Event = namedtuple('Event', ['time', 'state', 'floor', 'pid', 'index', 'elevator'])
+Event.__new__.__defaults__ = (None,)
+
+_TIME_PATTERN = r'\[\s*(\d+\.\d{4})\]'
+
+
+def _event_pattern(elevator_pattern):
+    return re.compile(_TIME_PATTERN + r'(?:(OPEN|CLOSE|ARRIVE)-(-?[1-9]\d*)' + elevator_pattern +
+                      r'|(IN|OUT)-(\d+)-(-?[1-9]\d*)' + elevator_pattern + ')')
+
+
+# the single elevator homework ignores whatever follows the floor, as it always has; only with multi_elevator
+# a trailing -<car id> names the car
+_EVENT_PATTERN = _event_pattern('()')
+_CAR_EVENT_PATTERN = _event_pattern(r'(?:-([A-Za-z0-9]+))?')
+_KEYWORD_PATTERN = re.compile(r'[A-Z]+')
+_STATE_ERRORS = {
+    'OPEN': 'Output Format Error | Invalid Elevator OPEN State: ',
+    'CLOSE': 'Output Format Error | Invalid Elevator CLOSE State: ',
+    'IN': 'Output Format Error | Invalid Passenger IN State: ',
+    'OUT': 'Output Format Error | Invalid Passenger OUT State: ',
+    'ARRIVE': 'Output Format Error | Invalid Arrive State: ',
+}
+
+
+def _raise_output_error(state):
+    # the first upper case word decides which state the line was meant to be
+    matcher = _KEYWORD_PATTERN.search(state)
+    if not matcher or matcher.group(0) not in _STATE_ERRORS:
         raise ValueError('Output Format Error | Invalid State: ' + state)
-    return parse_mapper[state_keywords[0]](state)
+    raise ValueError(_STATE_ERRORS[matcher.group(0)] + state)
+
+
+def parse_output(state, index=0, multi_elevator=False):
+    matcher = (_CAR_EVENT_PATTERN if multi_elevator else _EVENT_PATTERN).match(state)
+    if not matcher:
+        _raise_output_error(state)
+    time, elevator_state, floor, elevator, passenger_state, pid, passenger_floor, passenger_elevator = \
+        matcher.groups()
+    if elevator_state:
+        return Event(float(time), elevator_state, int(floor), None, index, elevator or None)
+    return Event(float(time), passenger_state, int(passenger_floor), int(pid), index, passenger_elevator or None)
+
+
+def parse_output_list(output_list, multi_elevator=False):
+    return [parse_output(state, index, multi_elevator) for index, state in enumerate(output_list)]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,95 @@
+import argparse
+import io
+import json
+import os
+import socketserver
+import sys
+
+from pyspj import execute_spj
+
+from metrics import last_record
+from metrics import enabled as metrics_enabled
+from spj import spj_func
+
+SOCKET_ENV = 'ELEVATOR_SPJ_SOCKET'
+DEFAULT_SOCKET = '/tmp/elevator-spj.sock'
+
+
+def _open_stream(request, name):
+    if name in request:
+        return io.StringIO(request[name])
+    if name + '_file' in request:
+        return open(request[name + '_file'])
+    raise ValueError('Either {name} or {name}_file should be given.'.format(name=name))
+
+
+def handle_request(request):
+    # same result as running "spj.py -I <stdin_file> -O <stdout_file> -V key=value ..." through pyspj
+    try:
+        with _open_stream(request, 'stdin') as stdin, _open_stream(request, 'stdout') as stdout:
+            values = request.get('values') or {}
+            result = execute_spj(spj_func, stdin, stdout, arguments=values)
+        response = result.to_json()
+        if metrics_enabled(values.get('metrics')):
+            response['metrics'] = last_record()
+        return response
+    except (OSError, ValueError, TypeError) as err:
+        return {'error': str(err)}
+
+
+def _handle_line(line):
+    try:
+        request = json.loads(line)
+    except ValueError as err:
+        return {'error': 'Invalid request - ' + str(err)}
+    if not isinstance(request, dict):
+        return {'error': 'Invalid request - a JSON object is expected'}
+    return handle_request(request)
+
+
+class _JudgeHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = _handle_line(line.decode())
+            self.wfile.write((json.dumps(response, sort_keys=True) + '\n').encode())
+            self.wfile.flush()
+
+
+class _JudgeServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with _JudgeServer(socket_path, _JudgeHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+
+def serve_stdio(stdin=sys.stdin, stdout=sys.stdout):
+    for line in stdin:
+        if not line.strip():
+            continue
+        stdout.write(json.dumps(_handle_line(line), sort_keys=True) + '\n')
+        stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resident elevator special judge, one JSON request per line.')
+    parser.add_argument('-s', '--socket', default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET),
+                        help='unix socket to listen on')
+    parser.add_argument('--stdio', action='store_true', help='read requests from stdin and answer on stdout instead')
+    args = parser.parse_args(argv)
+    if args.stdio:
+        serve_stdio()
+    else:
+        serve_socket(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,12 @@
 import io
 import re
-from typing import List
+from typing import Iterable, Iterator, List
 
-from pyspj import pyspj_entry
-
-from judge import judge
-
-__VERSION__ = '0.0.3'
+from judge import judge_stream_with_index, judge_with_index
+from metrics import collect, phase
+from metrics import enabled as metrics_enabled
+from metrics import write as write_metrics
+from version import __VERSION__
 
 PRETIME_PATTERN = re.compile(r'^\[\s*\d+\.\d+\](.*)')
 
@@ -23,37 +23,138 @@ def _tail_strip(lst: List[str]) -> List[str]:
     return lst[:i]
 
 
-def spj_func(stdin: io.TextIOBase, stdout: io.TextIOBase,
-             check_max_time=None, need_decrypt=None):
-    check_max_time = not not check_max_time
-    need_decrypt = not not need_decrypt
+def _iter_tail_strip(iterable: Iterable[str]) -> Iterator[str]:
+    # empty lines are only held back until a non-empty line shows they are not trailing
+    empty_count = 0
+    for item in iterable:
+        if not item:
+            empty_count += 1
+            continue
+        for i in range(empty_count):
+            yield ''
+        empty_count = 0
+        yield item
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return not not value
+
+
+def _time_options(trials=None, workers=None, seed=None, engine=None, sampler=None,
+                  adaptive=None, tolerance=None, budget=None):
+    options = {}
+    if trials is not None:
+        options['trials'] = int(trials)
+    if workers is not None:
+        options['workers'] = int(workers)
+    if seed is not None:
+        options['seed'] = int(seed)
+    if engine is not None:
+        options['engine'] = str(engine)
+    if sampler is not None:
+        options['sampler'] = str(sampler)
+    if adaptive is not None:
+        options['adaptive'] = _to_bool(adaptive)
+    if tolerance is not None:
+        options['tolerance'] = float(tolerance)
+    if budget is not None:
+        options['budget'] = float(budget)
+    return options
+
+
+def _write_output_lines(writer, output_list, error_index, window):
+    # window is the number of lines shown on each side of the blamed line, or of the last line if none is blamed
+    if not window or len(output_list) <= 2 * window + 1:
+        begin, end = 0, len(output_list)
+    else:
+        center = len(output_list) - 1 if error_index is None else min(error_index, len(output_list) - 1)
+        begin = max(0, center - window)
+        end = min(len(output_list), center + window + 1)
+    if begin > 0:
+        writer.write('... ({count} lines omitted)\n'.format(count=begin))
+    for output in output_list[begin:end]:
+        writer.write(output)
+        writer.write('\n')
+    if end < len(output_list):
+        writer.write('... ({count} lines omitted)\n'.format(count=len(output_list) - end))
+
+
+def _spj_result(stdin, stdout, check_max_time, need_decrypt, time_options, stream, report_window, event_cache,
+                verdict_memo, multi_elevator):
     no_pretime = True
-
-    input_list = _tail_strip(list(map(str.strip, stdin)))
-    output_list = _tail_strip(list(map(str.strip, stdout)))
-    if no_pretime:
-        output_list = list(map(_remove_pretime, output_list))
-
-    _correct, _message, decrypted_output_list, _score = judge(
-        input_list, output_list,
-        check_max_time, need_decrypt
-    )
-
-    message_and_content = _message.split(' | ')
-    if len(message_and_content) != 2:
-        _message = _message
-        _content = ''
+    with phase('read'):
+        input_list = _tail_strip(list(map(str.strip, stdin)))
+    if stream:
+        output_iter = _iter_tail_strip(map(str.strip, stdout))
+        if no_pretime:
+            output_iter = map(_remove_pretime, output_iter)
+        _correct, _message, decrypted_output_list, _score, error_index = judge_stream_with_index(
+            input_list, output_iter,
+            check_max_time, need_decrypt, time_options, multi_elevator=multi_elevator
+        )
     else:
-        _message = message_and_content[0]
-        _content = message_and_content[1] + '\n'
-    _content += 'Your real output is listed as follows:\n'
-    for output in decrypted_output_list:
-        _content += output + '\n'
+        with phase('read'):
+            output_list = _tail_strip(list(map(str.strip, stdout)))
+            if no_pretime:
+                output_list = list(map(_remove_pretime, output_list))
+
+        _correct, _message, decrypted_output_list, _score, error_index = judge_with_index(
+            input_list, output_list,
+            check_max_time, need_decrypt, time_options, event_cache=event_cache, verdict_memo=verdict_memo,
+            multi_elevator=multi_elevator
+        )
+
+    with phase('report'):
+        message_and_content = _message.split(' | ')
+        if len(message_and_content) != 2:
+            _message = _message
+            _content = ''
+        else:
+            _message = message_and_content[0]
+            _content = message_and_content[1] + '\n'
+        writer = io.StringIO()
+        writer.write(_content)
+        writer.write('Your real output is listed as follows:\n')
+        _write_output_lines(writer, decrypted_output_list, error_index, report_window)
+
+    return _correct, _message, writer.getvalue(), _score
+
 
+def spj_func(stdin: io.TextIOBase, stdout: io.TextIOBase,
+             check_max_time=None, need_decrypt=None,
+             trials=None, workers=None, seed=None, engine=None, sampler=None,
+             adaptive=None, tolerance=None, budget=None, stream=None, report_window=None,
+             metrics=None, metrics_file=None, event_cache=None, verdict_memo=None, multi_elevator=None):
+    check_max_time = not not check_max_time
+    need_decrypt = not not need_decrypt
+    stream = _to_bool(stream)
+    report_window = int(report_window or 0)
+    event_cache = _to_bool(event_cache)
+    verdict_memo = _to_bool(verdict_memo)
+    multi_elevator = _to_bool(multi_elevator)
+    time_options = _time_options(trials, workers, seed, engine, sampler,
+                                 adaptive, tolerance, budget)
+
+    if not metrics_enabled(metrics):
+        return _spj_result(stdin, stdout, check_max_time, need_decrypt, time_options, stream, report_window,
+                           event_cache, verdict_memo, multi_elevator)[:3]
+    with collect() as record, phase('total'):
+        _correct, _message, _content, _score = _spj_result(stdin, stdout, check_max_time, need_decrypt,
+                                                           time_options, stream, report_window, event_cache,
+                                                           verdict_memo, multi_elevator)
+    record.update({'correct': _correct, 'message': _message, 'score': _score})
+    write_metrics(record, metrics_file)
     return _correct, _message, _content
 
 
 if __name__ == '__main__':
+    import multiprocessing
+
+    from pyspj import pyspj_entry
+
+    multiprocessing.freeze_support()
     pyspj_entry(
         'elevator-2-spj', spj_func,
         version=__VERSION__,  # optional
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+
+from version import __VERSION__
+
+SOCKET_ENV = 'ELEVATOR_SPJ_SOCKET'
+DEFAULT_SOCKET = '/tmp/elevator-spj.sock'
+SPJ_COMMAND_ENV = 'ELEVATOR_SPJ_COMMAND'
+
+
+def _build_request(args):
+    if not args.input_content and not args.input_file:
+        raise ValueError('Either -i or -I should be given.')
+    if not args.output_content and not args.output_file:
+        raise ValueError('Either -o or -O should be given.')
+    request = {'values': dict(value.split('=', 1) if '=' in value else (value, '') for value in args.value)}
+    if args.input_content:
+        request['stdin'] = args.input_content
+    else:
+        request['stdin_file'] = os.path.abspath(args.input_file)
+    if args.output_content:
+        request['stdout'] = args.output_content
+    else:
+        request['stdout_file'] = os.path.abspath(args.output_file)
+    return request
+
+
+def _remote_judge(socket_path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + '\n').encode())
+        with client.makefile('rb') as response_file:
+            line = response_file.readline()
+    if not line:
+        raise ConnectionError('Judge server closed the connection')
+    return json.loads(line.decode())
+
+
+def _spj_command():
+    # the standalone special judge: given by the environment, next to a frozen client, or spj.py beside this file
+    if os.environ.get(SPJ_COMMAND_ENV):
+        return [os.environ[SPJ_COMMAND_ENV]]
+    if getattr(sys, 'frozen', False):
+        return [os.path.join(os.path.dirname(sys.executable), 'spj')]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spj.py')]
+
+
+def _local_judge(args):
+    # no resident server, the standalone special judge is run the slow way and prints the result itself
+    command = _spj_command()
+    if args.input_content:
+        command += ['-i', args.input_content]
+    else:
+        command += ['-I', args.input_file]
+    if args.output_content:
+        command += ['-o', args.output_content]
+    else:
+        command += ['-O', args.output_file]
+    for value in args.value:
+        command += ['-V', value]
+    if args.pretty:
+        command.append('-p')
+    return subprocess.run(command).returncode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Elevator-2-spj - test a pair of given input and output '
+                                                 'on the resident judge server.')
+    parser.add_argument('-v', '--version', action='store_true', help="Show special judge's version information.")
+    parser.add_argument('-i', '--input', dest='input_content', help='Input content of special judge.')
+    parser.add_argument('-o', '--output', dest='output_content', help='Output content of special judge')
+    parser.add_argument('-I', '--input_file',
+                        help='Input file of special judge (if -i is given, this will be ignored).')
+    parser.add_argument('-O', '--output_file',
+                        help='Output file of special judge (if -o is given, this will be ignored).')
+    parser.add_argument('-V', '--value', action='append', default=[], help='Attached values for special judge.')
+    parser.add_argument('-p', '--pretty', action='store_true', help='Use pretty mode to print json result.')
+    parser.add_argument('-s', '--socket', default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET),
+                        help='unix socket of the judge server')
+    args = parser.parse_args(argv)
+
+    if args.version:
+        print('Special judge - elevator-2-spj, version {version} (resident client).'.format(version=__VERSION__))
+        return 0
+    try:
+        request = _build_request(args)
+    except ValueError as err:
+        print(str(err), file=sys.stderr)
+        return 1
+    try:
+        result = _remote_judge(args.socket, request)
+    except (OSError, ValueError):
+        return _local_judge(args)
+    if 'error' in result:
+        print(result['error'], file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=4 if args.pretty else None, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
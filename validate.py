@@ -0,0 +1,133 @@
+import argparse
+import fnmatch
+import glob
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+from multiprocessing import Pool
+
+from check import _cached_calculate_time, _check_validity, _parse_request_list, _simulated_time_bounds, \
+    max_base_time
+from spj import _time_options
+
+DEFAULT_PATTERN = '*.txt'
+
+
+def find_inputs(paths, pattern=DEFAULT_PATTERN):
+    # every path is a file, a directory searched for files matching pattern, or a glob
+    input_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                input_paths.extend(os.path.join(root, name) for name in sorted(files)
+                                   if fnmatch.fnmatch(name, pattern))
+        elif os.path.isfile(path):
+            input_paths.append(path)
+        else:
+            input_paths.extend(sorted(name for name in glob.glob(path, recursive=True) if os.path.isfile(name)))
+    return input_paths
+
+
+def _cheap_report(content):
+    # the rules of check.check, then the analytic bounds of the slowest trial; None if only simulation can tell
+    try:
+        text = content.decode()
+    except UnicodeDecodeError as e:
+        return {'valid': False, 'message': 'Invalid Input Encoding: ' + str(e), 'decided_by': 'rules'}, None
+    try:
+        # the lines check.check reads from a text file, universal newlines and nothing else ends a line
+        request_list = _parse_request_list(list(io.StringIO(text, newline=None)))
+        _check_validity(request_list)
+    except ValueError as e:
+        return {'valid': False, 'message': str(e), 'decided_by': 'rules'}, None
+    lower_time, upper_time = _simulated_time_bounds(request_list)
+    if math.ceil(lower_time) >= max_base_time:
+        return {'valid': False, 'message': 'Request execute time too long', 'decided_by': 'bounds'}, None
+    if math.ceil(upper_time) < max_base_time:
+        return {'valid': True, 'message': 'Your input is valid, base time is at most ' + str(math.ceil(upper_time)),
+                'decided_by': 'bounds'}, None
+    return None, request_list
+
+
+def _simulate_task(task):
+    request_list, options = task
+    base_time, max_time = _cached_calculate_time(request_list, **options)
+    if base_time >= max_base_time:
+        message = 'Request execute time too long'
+    else:
+        message = 'Your input is valid, base time is ' + str(base_time) + ', max time is ' + str(max_time)
+    return {'valid': base_time < max_base_time, 'message': message, 'decided_by': 'simulation',
+            'base_time': base_time, 'max_time': max_time}
+
+
+def validate_inputs(input_paths, options=None, workers=None):
+    # one report per path, in order. identical files are validated once, only the estimates that the rules and
+    # bounds cannot settle are simulated, in parallel over the files
+    options = options or {}
+    reports = []
+    first_reports = {}
+    tasks = []
+    for path in input_paths:
+        with open(path, 'rb') as input_file:
+            content = input_file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        report = {'path': path, 'sha256': digest}
+        reports.append(report)
+        if digest in first_reports:
+            report['duplicate_of'] = first_reports[digest]['path']
+            continue
+        first_reports[digest] = report
+        cheap_report, request_list = _cheap_report(content)
+        if cheap_report is not None:
+            report.update(cheap_report)
+        else:
+            tasks.append((report, request_list))
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        simulated_reports = map(_simulate_task, [(request_list, options) for report, request_list in tasks])
+    else:
+        # the files are the parallel level, pool workers are daemonic and cannot start trial workers of their own
+        simulate_options = dict(options, workers=1)
+        with Pool(min(workers, len(tasks))) as pool:
+            simulated_reports = pool.map(_simulate_task, [(request_list, simulate_options)
+                                                          for report, request_list in tasks])
+    for (report, request_list), simulated_report in zip(tasks, simulated_reports):
+        report.update(simulated_report)
+
+    for report in reports:
+        if 'duplicate_of' in report:
+            first_report = first_reports[report['sha256']]
+            report.update({key: value for key, value in first_report.items() if key not in ('path', 'sha256')})
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate many input files at once, as check.check does for one.')
+    parser.add_argument('paths', nargs='+', help='input files, directories or globs')
+    parser.add_argument('-p', '--pattern', default=DEFAULT_PATTERN,
+                        help='file name pattern inside directories, default is ' + DEFAULT_PATTERN)
+    parser.add_argument('-o', '--output', help='JSON Lines report file, default is stdout')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, default is all cores')
+    parser.add_argument('-V', '--value', action='append', default=[],
+                        help='time estimate option as in data.yml, e.g. -V trials=5000')
+    args = parser.parse_args(argv)
+
+    options = _time_options(**dict(value.split('=', 1) for value in args.value))
+    reports = validate_inputs(find_inputs(args.paths, args.pattern), options, args.workers)
+    report_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for report in reports:
+            report_file.write(json.dumps(report, ensure_ascii=False) + '\n')
+    finally:
+        if report_file is not sys.stdout:
+            report_file.close()
+    return 0 if all(report['valid'] for report in reports) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
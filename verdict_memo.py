@@ -0,0 +1,59 @@
+import importlib.util
+import sys
+
+from cache import hash_key, open_cache
+
+# the modules whose code decides a verdict, a stored verdict is only used while none of them has changed
+RULE_MODULES = ['model', 'parse', 'judge', 'check', 'aes']
+# longer outputs are not stored, their entries would mostly be the output listing of the report
+max_memo_lines = 100000
+
+_memo = None
+_fingerprint = None
+
+
+def _get_memo():
+    global _memo
+    if _memo is None:
+        _memo = open_cache('verdict') or False
+    return _memo or None
+
+
+def rules_fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        parts = []
+        for name in RULE_MODULES:
+            # the sources are found without importing them, a time limit or decryption may never be needed
+            module = sys.modules.get(name)
+            try:
+                path = module.__file__ if module is not None else importlib.util.find_spec(name).origin
+                with open(path, 'rb') as module_file:
+                    parts.append(module_file.read())
+            except (AttributeError, TypeError, OSError):
+                # a frozen build has no sources, only its version tells its rules apart
+                parts.append(name)
+        _fingerprint = hash_key('rules', *parts)
+    return _fingerprint
+
+
+def verdict_key(input_list, output_list, options):
+    from version import __VERSION__
+    return hash_key('verdict', __VERSION__, rules_fingerprint(), input_list, '\n'.join(output_list), options)
+
+
+def load_verdict(key):
+    memo = _get_memo()
+    cached = memo.get(key) if memo is not None else None
+    return tuple(cached) if cached is not None else None
+
+
+def save_verdict(key, verdict):
+    memo = _get_memo()
+    if memo is not None and len(verdict[2]) <= max_memo_lines:
+        memo.put(key, list(verdict))
+
+
+if __name__ == '__main__':
+    _cache = _get_memo()
+    print(_cache.path if _cache else 'cache disabled', _cache.stats() if _cache else '')